@@ -1,9 +1,11 @@
 import sys
 import os
+import datetime
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTextEdit, QPushButton, QTreeView, QFileSystemModel, QLabel,
-    QSizePolicy, QSplitter, QFileDialog
+    QSizePolicy, QSplitter, QFileDialog, QDialog, QPlainTextEdit, QLineEdit,
+    QComboBox, QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView
 )
 from PyQt5.QtCore import Qt, QDir
 
@@ -14,6 +16,30 @@ from PyQt5.QtCore import Qt, QDir
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 OUTPUT_DIR_NAME = "output"
 OUTPUT_DIR_PATH = os.path.join(PROJECT_ROOT, OUTPUT_DIR_NAME)
+TEMPLATES_DIR_PATH = os.path.join(PROJECT_ROOT, "templates")
+PROMPT_INDEX_PATH = os.path.join(PROJECT_ROOT, ".prompt_index.json")
+NO_TEMPLATE_LABEL = "(No template)"
+SINGLE_PROMPT_LABEL = "(Single prompt, no chat)"
+BENCHMARK_COLUMNS = ["File", "Status", "Wall (s)", "CPU (s)", "Peak RSS (MB)", "Run at"]
+
+# The response pane keeps at most this many lines; older lines are dropped.
+RESPONSE_MAX_BLOCKS = 5000
+# Characters of a file shown in the response pane before "Show Full Text" is needed.
+PREVIEW_CHARS = 4000
+
+
+def read_text_preview(path, max_chars=PREVIEW_CHARS):
+    """Reads at most max_chars characters of a text file.
+
+    Returns (text, truncated). Falls back to latin-1 if the file is not UTF-8.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read(max_chars + 1)
+    except UnicodeDecodeError:
+        with open(path, 'r', encoding='latin-1') as f: # Common fallback
+            text = f.read(max_chars + 1)
+    return text[:max_chars], len(text) > max_chars
 
 
 class MainWindow(QMainWindow):
@@ -41,6 +67,8 @@ class MainWindow(QMainWindow):
         self.file_panel_widget = QWidget()
         self.file_panel_layout = QVBoxLayout(self.file_panel_widget)
         self.file_panel_label = QLabel("Project Output Explorer")
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search files (press Enter)...")
         self.file_tree = QTreeView()
         self.fs_model = QFileSystemModel()
 
@@ -52,9 +80,14 @@ class MainWindow(QMainWindow):
         self.file_tree.setRootIndex(self.fs_model.index(OUTPUT_DIR_PATH)) # Crucial: Set the root index to the output dir
         self.file_tree.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.file_tree.setColumnWidth(0, 250) # Adjust column width for names
+        self.file_tree.setSelectionMode(QAbstractItemView.ExtendedSelection) # Several files can be benchmarked together
+        self.run_button = QPushButton("Run && Benchmark Selected")
+        self.benchmark_dialog = None # Created on first use; keeps results across runs for comparison
 
         self.file_panel_layout.addWidget(self.file_panel_label)
+        self.file_panel_layout.addWidget(self.search_input)
         self.file_panel_layout.addWidget(self.file_tree)
+        self.file_panel_layout.addWidget(self.run_button)
         splitter.addWidget(self.file_panel_widget)
 
         self.right_panel_widget = QWidget()
@@ -65,20 +98,47 @@ class MainWindow(QMainWindow):
         self.prompt_input.setPlaceholderText("e.g., Create a Python function to sort a list...")
         self.prompt_input.setFixedHeight(150)
 
+        self.template_layout = QHBoxLayout()
+        self.template_selector = QComboBox()
+        self.template_selector.addItem(NO_TEMPLATE_LABEL)
+        self.save_template_button = QPushButton("Save as Template")
+        self.template_batch_button = QPushButton("Run Template on CSV")
+        self.template_layout.addWidget(QLabel("Template:"))
+        self.template_layout.addWidget(self.template_selector, 1)
+        self.template_layout.addWidget(self.save_template_button)
+        self.template_layout.addWidget(self.template_batch_button)
+
         self.response_label = QLabel("Generated Code/API Response:")
         self.response_display = QTextEdit()
         self.response_display.setReadOnly(True)
+        # Bound the scrollback so long sessions don't accumulate every response.
+        self.response_display.document().setMaximumBlockCount(RESPONSE_MAX_BLOCKS)
+        self.full_text_path = None # File behind the preview currently shown, if any
 
         self.button_layout = QHBoxLayout()
         self.generate_button = QPushButton("Generate Code")
         self.save_button = QPushButton("Save Project (Zip)")
         self.github_button = QPushButton("Upload to GitHub") # Not implemented yet
+        self.full_text_button = QPushButton("Show Full Text")
+        self.full_text_button.setEnabled(False)
 
         self.button_layout.addWidget(self.generate_button)
+        self.button_layout.addWidget(self.full_text_button)
         self.button_layout.addStretch()
         self.button_layout.addWidget(self.save_button)
         self.button_layout.addWidget(self.github_button)
 
+        self.chat_layout = QHBoxLayout()
+        self.chat_selector = QComboBox()
+        self.chat_selector.addItem(SINGLE_PROMPT_LABEL)
+        self.new_chat_button = QPushButton("New Chat")
+        self.chat_layout.addWidget(QLabel("Session:"))
+        self.chat_layout.addWidget(self.chat_selector, 1)
+        self.chat_layout.addWidget(self.new_chat_button)
+        self.chat_sessions = {} # Session name -> chat.ChatSession
+
+        self.right_panel_layout.addLayout(self.chat_layout)
+        self.right_panel_layout.addLayout(self.template_layout)
         self.right_panel_layout.addWidget(self.prompt_label)
         self.right_panel_layout.addWidget(self.prompt_input)
         self.right_panel_layout.addWidget(self.response_label)
@@ -96,28 +156,137 @@ class MainWindow(QMainWindow):
         # or via methods exposed by this class.
         # For file tree interaction:
         self.file_tree.doubleClicked.connect(self._handle_file_tree_double_click)
+        self.full_text_button.clicked.connect(self.show_full_text)
         # The actual button connections (generate, save) are set up in main.py
 
     def _handle_file_tree_double_click(self, index):
         path = self.fs_model.filePath(index)
         if self.fs_model.isFile(index):
-            try:
-                # Try to detect encoding, fallback to utf-8
-                content = ""
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    with open(path, 'r', encoding='latin-1') as f: # Common fallback
-                        content = f.read()
-
-                self.response_display.setText(f"--- Content of {os.path.basename(path)} ---\n\n{content}")
-            except Exception as e:
-                self.response_display.setText(f"Error reading file {os.path.basename(path)}: {e}")
+            self.show_file_preview(path, f"--- Content of {os.path.basename(path)} ---\n\n")
         else:
             # Optionally, expand/collapse directory or other actions
             print(f"Directory double-clicked: {path}")
 
+    def show_file_preview(self, path, header=""):
+        """Shows the beginning of a file; the rest is loaded via "Show Full Text"."""
+        try:
+            preview, truncated = read_text_preview(path)
+        except Exception as e:
+            self.set_full_text_path(None)
+            self.response_display.setText(f"Error reading file {os.path.basename(path)}: {e}")
+            return
+        if truncated:
+            preview += "\n\n... [preview truncated, use \"Show Full Text\" to see the whole file]"
+        self.response_display.setText(header + preview)
+        self.set_full_text_path(path)
+
+    def show_generation_result(self, result):
+        """Displays a GeminiAPI.GenerationResult without loading the whole file."""
+        self.response_display.setText(result.message)
+        self.set_full_text_path(result.filepath if not result.error else None)
+
+    def set_template_names(self, names):
+        """Repopulates the template selector, keeping the current choice if it still exists."""
+        current = self.template_selector.currentText()
+        self.template_selector.blockSignals(True)
+        self.template_selector.clear()
+        self.template_selector.addItem(NO_TEMPLATE_LABEL)
+        self.template_selector.addItems(names)
+        index = self.template_selector.findText(current)
+        self.template_selector.setCurrentIndex(max(index, 0))
+        self.template_selector.blockSignals(False)
+
+    def selected_template_name(self):
+        """Name of the selected template, or None."""
+        if self.template_selector.currentIndex() <= 0:
+            return None
+        return self.template_selector.currentText()
+
+    def add_chat_session(self, session):
+        """Registers a chat session and makes it the active one."""
+        self.chat_sessions[session.name] = session
+        self.chat_selector.addItem(session.name)
+        self.chat_selector.setCurrentText(session.name)
+
+    def current_chat_session(self):
+        """The active chat session, or None for stateless single prompts."""
+        return self.chat_sessions.get(self.chat_selector.currentText())
+
+    def selected_file_paths(self):
+        """Paths of the files (not directories) selected in the file tree."""
+        return [
+            self.fs_model.filePath(index)
+            for index in self.file_tree.selectionModel().selectedRows(0)
+            if self.fs_model.isFile(index)
+        ]
+
+    def show_benchmark_results(self, results):
+        """Appends runner.RunResult rows to the benchmark table and shows it."""
+        if self.benchmark_dialog is None:
+            self.benchmark_dialog = QDialog(self)
+            self.benchmark_dialog.setWindowTitle("Run & Benchmark Results")
+            self.benchmark_dialog.resize(900, 400)
+            self.benchmark_table = QTableWidget(0, len(BENCHMARK_COLUMNS), self.benchmark_dialog)
+            self.benchmark_table.setHorizontalHeaderLabels(BENCHMARK_COLUMNS)
+            self.benchmark_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            self.benchmark_table.setSortingEnabled(True)
+            self.benchmark_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+            QVBoxLayout(self.benchmark_dialog).addWidget(self.benchmark_table)
+
+        run_at = datetime.datetime.now().strftime("%H:%M:%S")
+        self.benchmark_table.setSortingEnabled(False) # Keep inserted rows together while filling them
+        for result in results:
+            row = self.benchmark_table.rowCount()
+            self.benchmark_table.insertRow(row)
+            values = [
+                os.path.relpath(result.path, OUTPUT_DIR_PATH),
+                result.status,
+                result.wall_time,
+                result.cpu_time,
+                result.peak_rss_kb / 1024 if result.peak_rss_kb is not None else None,
+                run_at,
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, float):
+                    item.setData(Qt.DisplayRole, round(value, 3)) # Numeric, so sorting works
+                else:
+                    item.setText("n/a" if value is None else str(value))
+                if column == 1 and (result.stderr or result.error):
+                    item.setToolTip(result.error or result.stderr)
+                self.benchmark_table.setItem(row, column, item)
+        self.benchmark_table.setSortingEnabled(True)
+        self.benchmark_dialog.show()
+        self.benchmark_dialog.raise_()
+
+    def set_full_text_path(self, path):
+        self.full_text_path = path
+        self.full_text_button.setEnabled(path is not None)
+
+    def show_full_text(self):
+        """Opens the full contents of the current file in a separate viewer.
+
+        The viewer is created on demand and destroyed when closed, so the full
+        text is only held in memory while it is being looked at.
+        """
+        if not self.full_text_path:
+            return
+        try:
+            with open(self.full_text_path, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except OSError as e:
+            self.response_display.setText(f"Error reading file {os.path.basename(self.full_text_path)}: {e}")
+            return
+
+        dialog = QDialog(self)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        dialog.setWindowTitle(os.path.basename(self.full_text_path))
+        dialog.resize(900, 700)
+        viewer = QPlainTextEdit(dialog) # Handles large documents better than QTextEdit
+        viewer.setReadOnly(True)
+        viewer.setPlainText(content)
+        QVBoxLayout(dialog).addWidget(viewer)
+        dialog.show()
 
     def refresh_file_tree(self):
         """Refreshes the QTreeView to show current contents of OUTPUT_DIR_PATH."""
@@ -1,6 +1,10 @@
 import google.generativeai as genai
+import google.ai.generativelanguage as glm
+import asyncio
+import itertools
 import os
 import datetime
+from typing import NamedTuple, Optional
 
 # Define the output directory relative to this script's location or a fixed path
 # For consistency, let's assume this script is in Gemini_Code_Generator/src
@@ -28,7 +32,18 @@ safety_settings = [
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
 ]
 
+DEFAULT_MODEL_NAME = "gemini-pro"
+
+# Defaults for AsyncGeminiClient. Timeouts are in seconds; None disables them.
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 120
+
+# Number of characters of a generated file kept in memory by generate_code_to_file.
+PREVIEW_CHARS = 4000
+
 model = None
+# Sequence numbers for generated filenames; see _next_output_path.
+_output_counter = itertools.count(1)
 
 def init_client(api_key: str = None):
     global model
@@ -39,7 +54,7 @@ def init_client(api_key: str = None):
 
     genai.configure(api_key=key_to_use)
     model = genai.GenerativeModel(
-        model_name="gemini-pro",
+        model_name=DEFAULT_MODEL_NAME,
         generation_config=generation_config,
         safety_settings=safety_settings,
     )
@@ -85,15 +100,337 @@ def generate_code(prompt: str) -> str:
                 print(f"Error saving generated code to file {filepath}: {e}")
                 return f"Error saving file: {e}\n\n{generated_text}"
 
-        elif response.prompt_feedback and response.prompt_feedback.block_reason:
-            return f"Error: Prompt blocked due to {response.prompt_feedback.block_reason_message}"
-        else:
-            # This case might indicate an issue or an empty response that's not an explicit block
-            return "Error: No content generated. The prompt might have been blocked or an unknown error occurred (empty response)."
+        return _empty_response_message(response)
 
     except Exception as e:
         return f"An error occurred during code generation: {e}"
 
+class GenerationResult(NamedTuple):
+    """Lightweight handle to a generated file: its path plus a bounded preview.
+
+    The full text lives only on disk; read `filepath` when it is needed.
+    """
+    filepath: Optional[str] = None
+    size: int = 0
+    preview: str = ""
+    truncated: bool = False
+    error: Optional[str] = None
+
+    @property
+    def message(self) -> str:
+        if self.error:
+            return self.error
+        text = f"Code generated and saved to {os.path.basename(self.filepath)}\n\n{self.preview}"
+        if self.truncated:
+            text += f"\n\n... [preview truncated, {self.size} bytes in file]"
+        return text
+
+def _next_output_path(output_dir: str = None) -> str:
+    """Fresh path for a generated file in output_dir (default: OUTPUT_DIR).
+
+    Several generations may finish within the same second, so a process-wide
+    sequence number keeps them from overwriting each other.
+    """
+    output_dir = output_dir if output_dir is not None else OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    while True:
+        filepath = os.path.join(output_dir, f"generated_code_{timestamp}_{next(_output_counter)}.py")
+        if not os.path.exists(filepath): # e.g. left by an earlier run in the same second
+            return filepath
+
+class _PreviewBuffer:
+    """Keeps the first `limit` characters of a stream of text chunks."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.truncated = False
+        self._parts = []
+        self._length = 0
+
+    def add(self, text: str):
+        if self._length < self.limit:
+            head = text[:self.limit - self._length]
+            self._parts.append(head)
+            self._length += len(head)
+            self.truncated = self.truncated or len(head) < len(text)
+        else:
+            self.truncated = True
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+def _remove_partial_file(filepath: str):
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
+
+def generate_code_to_file(prompt: str, preview_chars: int = PREVIEW_CHARS, send=None) -> GenerationResult:
+    """Like generate_code, but streams the response straight to disk.
+
+    Only the first `preview_chars` characters are kept in memory, so large
+    responses are never held as a whole string. `send` can replace the default
+    request: a callable taking the prompt and returning a streamed response
+    (e.g. a chat session's send_message with stream=True).
+    """
+    global model
+    if send is None and not model:
+        if not init_client():
+            return GenerationResult(error="Error: API Client not initialized and failed to auto-initialize. Please configure an API Key.")
+
+    filepath = _next_output_path()
+    try:
+        if send is not None:
+            response = send(prompt)
+        else:
+            response = model.generate_content([prompt], stream=True)
+        preview = _PreviewBuffer(preview_chars)
+        with open(filepath, "w", encoding="utf-8") as f:
+            for chunk in response:
+                if not chunk.parts:
+                    continue
+                text = chunk.text
+                f.write(text)
+                preview.add(text)
+    except IOError as e:
+        print(f"Error saving generated code to file {filepath}: {e}")
+        _remove_partial_file(filepath)
+        return GenerationResult(error=f"Error saving file: {e}")
+    except Exception as e:
+        # Don't leave a truncated file behind for the manifest and uploads to pick up.
+        _remove_partial_file(filepath)
+        return GenerationResult(error=f"An error occurred during code generation: {e}")
+
+    size = os.path.getsize(filepath)
+    if size == 0:
+        os.remove(filepath)
+        return GenerationResult(error=_empty_response_message(response))
+    print(f"Successfully saved generated code to: {os.path.abspath(filepath)}")
+    return GenerationResult(filepath=filepath, size=size, preview=preview.text, truncated=preview.truncated)
+
+def _empty_response_message(response) -> str:
+    """Builds the error message for a response that carries no generated parts."""
+    if response.prompt_feedback and response.prompt_feedback.block_reason:
+        return f"Error: Prompt blocked due to {response.prompt_feedback.block_reason_message}"
+    # This case might indicate an issue or an empty response that's not an explicit block
+    return "Error: No content generated. The prompt might have been blocked or an unknown error occurred (empty response)."
+
+
+class AsyncGeminiClient:
+    """Asyncio-native counterpart of init_client/generate_code.
+
+    Unlike the module-level functions, every instance owns its own model and
+    async transport, so clients with different keys, models or generation
+    configs can coexist in one process without touching the global `model`.
+    Remote calls are bounded by a per-client semaphore (`max_concurrency`) and
+    an optional per-call timeout. Cancelling the awaiting task cancels the
+    in-flight request.
+    """
+
+    # Module-level settings used when no per-client override is given.
+    default_generation_config = generation_config
+    default_safety_settings = safety_settings
+
+    def __init__(self, api_key: str = None, model_name: str = DEFAULT_MODEL_NAME,
+                 generation_config: dict = None, safety_settings: list = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 timeout: float = DEFAULT_TIMEOUT, output_dir: str = None):
+        key_to_use = api_key if api_key else API_KEY
+        if not key_to_use or key_to_use == "YOUR_API_KEY_HERE":
+            raise ValueError("API Key not configured. Please set it in GeminiAPI.py or pass it to AsyncGeminiClient.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        self.api_key = key_to_use
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.output_dir = output_dir
+        self.model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=generation_config if generation_config is not None else self.default_generation_config,
+            safety_settings=safety_settings if safety_settings is not None else self.default_safety_settings,
+        )
+        # The transport and semaphore are created on first use so that they bind
+        # to the event loop that actually runs the requests.
+        self._transport_client = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes the underlying async transport, if one was opened."""
+        if self._transport_client is not None:
+            await self._transport_client.transport.close()
+            self._transport_client = None
+            self.model._async_client = None
+
+    def _ensure_ready(self):
+        if self._transport_client is None:
+            self._transport_client = glm.GenerativeServiceAsyncClient(
+                client_options={"api_key": self.api_key}
+            )
+            # GenerativeModel otherwise falls back to the process-wide client
+            # configured through genai.configure(). _async_client is private SDK
+            # state (checked against google-generativeai 0.8): generate_content_async
+            # only creates its own client when it is None, so re-check this on
+            # SDK upgrades.
+            self.model._async_client = self._transport_client
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def _next_output_path(self) -> str:
+        return _next_output_path(self.output_dir)
+
+    async def agenerate_code(self, prompt: str, timeout: float = None) -> str:
+        """Async version of generate_code; returns the same kind of message.
+
+        `timeout` overrides the client default and covers the remote call only,
+        not the time spent waiting for a free concurrency slot.
+        """
+        self._ensure_ready()
+        timeout = timeout if timeout is not None else self.timeout
+        try:
+            async with self._semaphore:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async([prompt]), timeout
+                )
+        except asyncio.TimeoutError:
+            return f"Error: Code generation timed out after {timeout} seconds."
+        except Exception as e:
+            return f"An error occurred during code generation: {e}"
+
+        if not response.parts:
+            return _empty_response_message(response)
+
+        generated_text = response.text
+        filepath = self._next_output_path()
+        filename = os.path.basename(filepath)
+        try:
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(generated_text)
+            print(f"Successfully saved generated code to: {os.path.abspath(filepath)}")
+            return f"Code generated and saved to {filename}\n\n{generated_text}"
+        except IOError as e:
+            print(f"Error saving generated code to file {filepath}: {e}")
+            return f"Error saving file: {e}\n\n{generated_text}"
+
+    async def astream_code(self, prompt: str, timeout: float = None, filepath: str = None):
+        """Yields generated text chunks as they arrive from the API.
+
+        Chunks are also appended to `filepath` (a fresh timestamped file in the
+        output directory by default). `timeout` bounds the time spent waiting
+        on the API, not the time the caller spends between chunks; on expiry
+        asyncio.TimeoutError is raised and the partial file is kept.
+
+        The stream holds one of the client's concurrency slots until it is
+        exhausted or closed. A caller that stops iterating early must call
+        `await stream.aclose()` (e.g. in a finally block) to release the slot
+        and the connection; otherwise they are only freed when the generator
+        is garbage-collected.
+        """
+        self._ensure_ready()
+        timeout = timeout if timeout is not None else self.timeout
+        filepath = filepath if filepath else self._next_output_path()
+
+        loop = asyncio.get_running_loop()
+        remaining = timeout
+
+        async def from_api(awaitable):
+            nonlocal remaining
+            if remaining is None:
+                return await awaitable
+            started = loop.time()
+            try:
+                return await asyncio.wait_for(awaitable, max(remaining, 0))
+            finally:
+                remaining -= loop.time() - started
+
+        chunks = None
+        await self._semaphore.acquire()
+        try:
+            response = await from_api(self.model.generate_content_async([prompt], stream=True))
+            chunks = response.__aiter__()
+            with open(filepath, "w", encoding="utf-8") as f:
+                while True:
+                    try:
+                        chunk = await from_api(chunks.__anext__())
+                    except StopAsyncIteration:
+                        break
+                    if not chunk.parts:
+                        continue
+                    f.write(chunk.text)
+                    yield chunk.text
+        finally:
+            # Runs on exhaustion, errors and aclose(): free the slot right away.
+            self._semaphore.release()
+            if chunks is not None and hasattr(chunks, "aclose"):
+                await chunks.aclose()
+        print(f"Successfully saved streamed code to: {os.path.abspath(filepath)}")
+
+    async def agenerate_to_file(self, prompt: str, timeout: float = None,
+                                preview_chars: int = PREVIEW_CHARS) -> GenerationResult:
+        """Async version of generate_code_to_file: streams to disk, keeps only a preview.
+
+        `timeout` bounds the time spent waiting on the API, as in astream_code.
+        Failures are returned as a GenerationResult with `error` set, and the
+        partial file is removed.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        filepath = self._next_output_path()
+        preview = _PreviewBuffer(preview_chars)
+        stream = self.astream_code(prompt, timeout=timeout, filepath=filepath)
+        try:
+            try:
+                async for text in stream:
+                    preview.add(text)
+            finally:
+                await stream.aclose() # Release the concurrency slot even if we stop early
+        except asyncio.CancelledError:
+            _remove_partial_file(filepath)
+            raise
+        except asyncio.TimeoutError:
+            _remove_partial_file(filepath)
+            return GenerationResult(error=f"Error: Code generation timed out after {timeout} seconds.")
+        except Exception as e:
+            _remove_partial_file(filepath)
+            return GenerationResult(error=f"An error occurred during code generation: {e}")
+
+        size = os.path.getsize(filepath)
+        if size == 0:
+            os.remove(filepath)
+            return GenerationResult(error="Error: No content generated. The prompt might have been blocked or an unknown error occurred (empty response).")
+        return GenerationResult(filepath=filepath, size=size, preview=preview.text, truncated=preview.truncated)
+
+    async def agenerate_batch(self, prompts, timeout: float = None) -> list:
+        """Runs agenerate_code for every prompt, at most `max_concurrency` at a time.
+
+        Results are returned in prompt order. Per-prompt failures come back as
+        error messages; cancelling the batch cancels every pending request.
+        """
+        return await asyncio.gather(
+            *(self.agenerate_code(prompt, timeout=timeout) for prompt in prompts)
+        )
+
+    async def agenerate_batch_to_file(self, prompts, timeout: float = None, on_result=None) -> list:
+        """Like agenerate_batch, but runs agenerate_to_file and returns GenerationResults.
+
+        `on_result(index, result)` is called as each prompt finishes, so callers
+        can report progress before the whole batch is done.
+        """
+        async def generate(index, prompt):
+            result = await self.agenerate_to_file(prompt, timeout=timeout)
+            if on_result is not None:
+                on_result(index, result)
+            return result
+
+        return await asyncio.gather(*(generate(i, prompt) for i, prompt in enumerate(prompts)))
+
 if __name__ == '__main__':
     if API_KEY == "YOUR_API_KEY_HERE":
         print("Please replace 'YOUR_API_KEY_HERE' with your actual API key in GeminiAPI.py to run this example.")
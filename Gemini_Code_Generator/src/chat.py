@@ -0,0 +1,130 @@
+import google.generativeai as genai
+import GeminiAPI
+
+DEFAULT_HISTORY_TOKEN_BUDGET = 8000
+DEFAULT_KEEP_RECENT_TURNS = 2
+# Rough size of a token; good enough for budgeting without a count_tokens round-trip.
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = (
+    "Summarize the following conversation between a user and a code generator so that the "
+    "summary can replace it as context for further requests. Keep every requirement and "
+    "decision, the names of files, functions and variables, and the latest version of any "
+    "code that later requests may build on. Be concise.\n\n{transcript}"
+)
+SUMMARY_PREFIX = "Summary of our conversation so far:\n\n"
+SUMMARY_ACKNOWLEDGEMENT = "Understood. I will continue from this summary."
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _content_text(content):
+    return "".join(part.text for part in content.parts)
+
+
+class ChatSession:
+    """Multi-turn code generation on top of the SDK's chat API, with bounded history.
+
+    After every turn the history is measured against token_budget. When it is
+    over budget, everything except the keep_recent_turns most recent turns is
+    summarized by the model into a single summary turn, so the context sent with
+    each request stays roughly constant instead of growing with the
+    conversation. If no summary can be produced, or the summary and recent
+    turns are still over budget, the oldest recent turns are dropped, and the
+    summary only when the latest exchange alone does not fit beside it.
+    """
+
+    def __init__(self, name, model=None, token_budget=DEFAULT_HISTORY_TOKEN_BUDGET,
+                 keep_recent_turns=DEFAULT_KEEP_RECENT_TURNS):
+        self.name = name
+        self.model = model # Defaults to GeminiAPI.model when the first message is sent
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.turn_count = 0
+        self.compaction_count = 0
+        self._chat = None
+
+    def _get_chat(self):
+        if self._chat is None:
+            if self.model is None:
+                if not GeminiAPI.model and not GeminiAPI.init_client():
+                    return None
+                self.model = GeminiAPI.model
+            self._chat = self.model.start_chat()
+        return self._chat
+
+    @property
+    def history(self):
+        """The SDK history (a list of Content) that will be sent with the next message."""
+        return self._chat.history if self._chat is not None else []
+
+    def history_tokens(self, history=None):
+        history = self.history if history is None else history
+        return sum(estimate_tokens(_content_text(content)) for content in history)
+
+    def send(self, prompt):
+        """Sends one turn and streams the reply to a file, like GeminiAPI.generate_code_to_file."""
+        chat = self._get_chat()
+        if chat is None:
+            return GeminiAPI.GenerationResult(error="Error: API Client not initialized and failed to auto-initialize. Please configure an API Key.")
+
+        turns_before = len(chat.history)
+        result = GeminiAPI.generate_code_to_file(prompt, send=lambda text: chat.send_message(text, stream=True))
+        try:
+            recorded = len(chat.history) > turns_before # Folds the finished reply into the history
+        except Exception:
+            # The stream broke off or was stopped (e.g. for safety); drop the incomplete turn.
+            chat.rewind()
+            return result
+        if result.error:
+            if recorded:
+                chat.rewind()
+            return result
+
+        self.turn_count += 1
+        self.compact()
+        return result
+
+    def compact(self):
+        """Brings the history back under token_budget. Returns True if it changed."""
+        history = list(self.history)
+        if self.history_tokens(history) <= self.token_budget:
+            return False
+
+        split = max(len(history) - 2 * self.keep_recent_turns, 0)
+        older, recent = history[:split], history[split:]
+        summary = self._summarize(older) if older else None
+        new_history = recent
+        if summary:
+            new_history = [
+                genai.protos.Content(role="user", parts=[genai.protos.Part(text=SUMMARY_PREFIX + summary)]),
+                genai.protos.Content(role="model", parts=[genai.protos.Part(text=SUMMARY_ACKNOWLEDGEMENT)]),
+            ] + recent
+
+        # Drop the oldest verbatim turns first, then the summary, which covers
+        # more of the conversation. Always keep the latest exchange, even if
+        # it alone exceeds the budget.
+        first_turn = 2 if summary else 0
+        while len(new_history) - first_turn > 2 and self.history_tokens(new_history) > self.token_budget:
+            del new_history[first_turn:first_turn + 2]
+        if first_turn and self.history_tokens(new_history) > self.token_budget:
+            new_history = new_history[first_turn:]
+
+        self._chat.history = new_history
+        self.compaction_count += 1
+        return True
+
+    def _summarize(self, contents):
+        transcript = "\n\n".join(
+            f"{'User' if content.role == 'user' else 'Assistant'}: {_content_text(content)}"
+            for content in contents
+        )
+        try:
+            response = self.model.generate_content(SUMMARY_PROMPT.format(transcript=transcript))
+            if response.parts:
+                return response.text
+        except Exception as e:
+            print(f"Could not summarize chat '{self.name}': {e}")
+        return None
@@ -1,12 +1,18 @@
 import sys
 import os
-import shutil
 import datetime
 import re # For URL validation and PAT insertion
-from PyQt5.QtWidgets import QApplication, QFileDialog, QInputDialog, QMessageBox, QLineEdit
-from PyQt5.QtCore import QDir # For QInputDialog path suggestions
-from GUI import MainWindow, OUTPUT_DIR_PATH
+import asyncio
+import zipfile
+from PyQt5.QtWidgets import QApplication, QFileDialog, QInputDialog, QMessageBox, QLineEdit, QProgressDialog
+from PyQt5.QtCore import QDir, QThread, Qt, pyqtSignal # QDir for QInputDialog path suggestions
+from GUI import MainWindow, OUTPUT_DIR_PATH, TEMPLATES_DIR_PATH, PROMPT_INDEX_PATH, read_text_preview
 import GeminiAPI
+from manifest import ArtifactManifest, ManifestWatcher
+from templates import PromptTemplate, TemplateLibrary, load_csv_rows, run_template_batch
+from similarity import PromptSimilarityIndex
+from chat import ChatSession
+import runner
 
 # Attempt to import GitPython
 try:
@@ -19,6 +25,12 @@ except ImportError:
     git = None
 
 main_window_instance = None
+artifact_watcher = None # Keeps the manifest of OUTPUT_DIR_PATH current while the app runs
+template_library = TemplateLibrary(TEMPLATES_DIR_PATH)
+prompt_index = PromptSimilarityIndex(PROMPT_INDEX_PATH) # Past prompts -> generated file paths
+applied_template = None # Template chosen in the selector; its model settings apply to generation
+template_batch_worker = None # The running TemplateBatchWorker, if any
+benchmark_worker = None # The running BenchmarkWorker, if any
 
 def display_error_message(title, message):
     """Helper function to display error messages in a QMessageBox."""
@@ -27,6 +39,22 @@ def display_error_message(title, message):
     else:
         print(f"ERROR: {title} - {message}")
 
+def get_artifact_manifest():
+    """Returns an up-to-date manifest of OUTPUT_DIR_PATH.
+
+    While the background watcher runs this only hashes files changed since
+    its last flush. Without it (e.g. when the handlers are used outside
+    main()) the directory is scanned once.
+    """
+    if artifact_watcher and artifact_watcher.is_running and \
+            artifact_watcher.manifest.root_dir == os.path.abspath(OUTPUT_DIR_PATH):
+        artifact_watcher.flush() # Include files whose writes were seen but not hashed yet
+        return artifact_watcher.manifest
+    artifacts = ArtifactManifest(OUTPUT_DIR_PATH)
+    artifacts.load() # Reuse known hashes so only changed files are rehashed
+    artifacts.scan()
+    return artifacts
+
 def handle_generate_code():
     global main_window_instance
     if not main_window_instance:
@@ -38,11 +66,306 @@ def handle_generate_code():
         main_window_instance.response_display.setText("Please enter a prompt.")
         return
 
+    session = main_window_instance.current_chat_session()
+    if session:
+        # Replies depend on the conversation, so the similarity cache doesn't apply here.
+        main_window_instance.response_display.setText(f"Sending to {session.name}, please wait...")
+        QApplication.processEvents()
+        result = session.send(prompt_text)
+        main_window_instance.show_generation_result(result)
+        if not result.error:
+            main_window_instance.response_display.append(
+                f"\n[{session.name}: turn {session.turn_count}, "
+                f"~{session.history_tokens()} tokens of history, {session.compaction_count} compactions]")
+        return
+
+    request_text = prompt_text
+    match = find_similar_generation(prompt_text)
+    if match:
+        choice = ask_reuse_similar(match)
+        if choice == "reuse":
+            main_window_instance.show_file_preview(
+                match.result, f"--- Reused result of a {match.similarity:.0%} similar prompt ---\n\n")
+            return
+        if choice == "seed":
+            previous_code, truncated = read_text_preview(match.result)
+            request_text = f"{prompt_text}\n\nUse this previous solution as a starting point:\n\n{previous_code}"
+            if truncated: # Keep the request bounded, but don't pass off a fragment as the whole solution
+                request_text += (f"\n\n[The previous solution is truncated here: only its first "
+                                 f"{len(previous_code)} characters are included.]")
+
+    send = None
+    if applied_template:
+        if not GeminiAPI.model and not GeminiAPI.init_client(): # Configures the API key for the template's model
+            main_window_instance.response_display.setText(
+                "Error: API Client not initialized and failed to auto-initialize. Please configure an API Key.")
+            return
+        template_model = applied_template.make_model()
+        if template_model:
+            send = lambda text: template_model.generate_content([text], stream=True)
+
     main_window_instance.response_display.setText("Generating code, please wait...")
     QApplication.processEvents()
 
-    response_message = GeminiAPI.generate_code(prompt_text)
-    main_window_instance.response_display.setText(response_message)
+    # Stream to disk and only keep a preview in memory; the full text is
+    # available on demand through the window's "Show Full Text" button.
+    result = GeminiAPI.generate_code_to_file(request_text, send=send)
+    main_window_instance.show_generation_result(result)
+    if not result.error:
+        prompt_index.add(prompt_text, os.path.abspath(result.filepath))
+        prompt_index.save()
+
+def handle_new_chat():
+    global main_window_instance
+    if not main_window_instance:
+        display_error_message("Error", "MainWindow instance not available.")
+        return
+
+    name = f"Chat {len(main_window_instance.chat_sessions) + 1}"
+    main_window_instance.add_chat_session(ChatSession(name))
+    main_window_instance.response_display.setText(
+        f"Started {name}. Follow-up prompts in this session build on the previous replies.")
+
+def find_similar_generation(prompt_text):
+    """Most similar earlier prompt whose generated file still exists, or None."""
+    match = prompt_index.lookup(prompt_text)
+    while match and not os.path.isfile(match.result):
+        prompt_index.remove(match.entry_id) # The generated file was deleted
+        match = prompt_index.lookup(prompt_text)
+    return match
+
+def ask_reuse_similar(match):
+    """Asks whether to reuse a similar earlier result. Returns "reuse", "seed" or "generate"."""
+    box = QMessageBox(main_window_instance)
+    box.setIcon(QMessageBox.Question)
+    box.setWindowTitle("Similar Prompt Found")
+    box.setText(f"A previous prompt is {match.similarity:.0%} similar to this one:\n\n{match.prompt[:300]}")
+    box.setInformativeText(f"Its result is in {os.path.basename(match.result)}. Reuse it instead of calling the API?")
+    reuse_button = box.addButton("Reuse Previous", QMessageBox.AcceptRole)
+    seed_button = box.addButton("Use as Seed", QMessageBox.ActionRole)
+    box.addButton("Generate New", QMessageBox.RejectRole)
+    box.exec_()
+    if box.clickedButton() is reuse_button:
+        return "reuse"
+    if box.clickedButton() is seed_button:
+        return "seed"
+    return "generate"
+
+def handle_apply_template():
+    """Fills the prompt box from the selected template, asking for each variable.
+
+    The template stays applied, so its model settings are used for generation,
+    until another template or "(No template)" is selected.
+    """
+    global main_window_instance, applied_template
+    if not main_window_instance:
+        display_error_message("Error", "MainWindow instance not available.")
+        return
+
+    applied_template = None
+    name = main_window_instance.selected_template_name()
+    if not name:
+        return
+    try:
+        template = template_library.get(name)
+    except (OSError, ValueError) as e:
+        display_error_message("Template Error", f"Could not load template '{name}': {e}")
+        return
+    applied_template = template
+
+    values = {}
+    for variable in template.variables:
+        value, ok = QInputDialog.getText(main_window_instance, f"Template: {name}", f"Value for '{variable}':")
+        if not ok:
+            # Leave the raw template in the prompt box so it can be filled in by hand.
+            main_window_instance.prompt_input.setPlainText(template.text)
+            return
+        values[variable] = value
+    main_window_instance.prompt_input.setPlainText(template.render(values))
+
+def handle_save_template():
+    global main_window_instance
+    if not main_window_instance:
+        display_error_message("Error", "MainWindow instance not available.")
+        return
+
+    prompt_text = main_window_instance.prompt_input.toPlainText()
+    if not prompt_text.strip():
+        main_window_instance.response_display.setText("Please enter a prompt to save as a template. Use $name for variables.")
+        return
+
+    name, ok = QInputDialog.getText(main_window_instance, "Save Template", "Template name:")
+    if not ok or not name.strip():
+        return
+    try:
+        template = PromptTemplate(name.strip(), prompt_text)
+        template_library.save(template)
+    except (OSError, ValueError) as e:
+        display_error_message("Template Error", f"Could not save template: {e}")
+        return
+
+    main_window_instance.set_template_names(template_library.names())
+    variables = ", ".join(template.variables) if template.variables else "none"
+    main_window_instance.response_display.setText(f"Template '{template.name}' saved (variables: {variables}).")
+
+class TemplateBatchWorker(QThread):
+    """Runs run_template_batch on its own event loop, off the GUI thread."""
+
+    progress = pyqtSignal(int, int) # done, total
+    succeeded = pyqtSignal(list) # GenerationResults in row order
+    failed = pyqtSignal(str)
+
+    def __init__(self, template, rows, cache, parent=None):
+        super().__init__(parent)
+        self.template = template
+        self.rows = rows
+        self.cache = cache
+        self._loop = None
+        self._task = None
+        self._cancelled = False
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            self._task = loop.create_task(run_template_batch(
+                self.template, self.rows, cache=self.cache, on_progress=self.progress.emit))
+            self._loop = loop
+            if self._cancelled:
+                self._task.cancel()
+            self.succeeded.emit(loop.run_until_complete(self._task))
+        except asyncio.CancelledError:
+            self.failed.emit("Template batch cancelled.")
+        except Exception as e: # e.g. missing CSV columns or API key
+            self.failed.emit(f"Template batch failed: {e}")
+        finally:
+            self._loop = None
+            loop.close()
+
+    def cancel(self):
+        """Cancels the batch from the GUI thread; pending requests are abandoned."""
+        self._cancelled = True
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass # The batch finished and its loop closed in the meantime
+
+def stop_template_batch():
+    """Cancels a running template batch and waits for its thread, e.g. on exit."""
+    if template_batch_worker and template_batch_worker.isRunning():
+        template_batch_worker.cancel()
+        template_batch_worker.wait()
+
+def handle_run_template_batch():
+    """Runs the selected template once per row of a CSV file, concurrently and in the background."""
+    global main_window_instance, template_batch_worker
+    if not main_window_instance:
+        display_error_message("Error", "MainWindow instance not available.")
+        return
+    if template_batch_worker and template_batch_worker.isRunning():
+        main_window_instance.response_display.setText("A template batch is already running.")
+        return
+
+    name = main_window_instance.selected_template_name()
+    if not name:
+        main_window_instance.response_display.setText("Please select a template first.")
+        return
+
+    csv_path, _ = QFileDialog.getOpenFileName(
+        main_window_instance, "Template Parameters (CSV)", QDir.homePath(), "CSV Files (*.csv)"
+    )
+    if not csv_path:
+        main_window_instance.response_display.setText("Template batch cancelled.")
+        return
+
+    try:
+        template = template_library.get(name)
+        rows = load_csv_rows(csv_path)
+    except (OSError, ValueError) as e:
+        display_error_message("Template Error", f"Could not prepare template batch: {e}")
+        return
+    if not rows:
+        main_window_instance.response_display.setText("The CSV file has no rows.")
+        return
+
+    main_window_instance.response_display.setText(f"Running template '{name}' for {len(rows)} rows...")
+    progress_dialog = QProgressDialog(f"Running template '{name}'...", "Cancel", 0, 0, main_window_instance)
+    progress_dialog.setWindowTitle("Template Batch")
+    progress_dialog.setWindowModality(Qt.WindowModal)
+    progress_dialog.setMinimumDuration(0)
+
+    def on_progress(done, total):
+        progress_dialog.setMaximum(total)
+        progress_dialog.setValue(done)
+        progress_dialog.setLabelText(f"Running template '{name}': {done} of {total} distinct prompts done.")
+
+    def on_succeeded(results):
+        progress_dialog.reset()
+        succeeded = sum(1 for result in results if not result.error)
+        summary = [f"Template '{name}': {succeeded} of {len(results)} rows generated successfully.", ""]
+        summary.extend(
+            f"Row {i}: {result.error or 'Code generated and saved to ' + os.path.basename(result.filepath)}"
+            for i, result in enumerate(results, 1))
+        main_window_instance.response_display.setText("\n".join(summary))
+
+    def on_failed(message):
+        progress_dialog.reset()
+        main_window_instance.response_display.setText(message)
+
+    template_batch_worker = TemplateBatchWorker(template, rows, template_library.prompt_cache, main_window_instance)
+    template_batch_worker.progress.connect(on_progress)
+    template_batch_worker.succeeded.connect(on_succeeded)
+    template_batch_worker.failed.connect(on_failed)
+    progress_dialog.canceled.connect(template_batch_worker.cancel)
+    main_window_instance.template_batch_button.setEnabled(False)
+    template_batch_worker.finished.connect(lambda: main_window_instance.template_batch_button.setEnabled(True))
+    template_batch_worker.start()
+
+class BenchmarkWorker(QThread):
+    """Runs runner.run_files off the GUI thread; each run can take up to its timeout."""
+
+    succeeded = pyqtSignal(list) # RunResults in the order of paths
+
+    def __init__(self, paths, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+
+    def run(self):
+        self.succeeded.emit(runner.run_files(self.paths))
+
+def wait_for_benchmark():
+    """Lets a running benchmark finish (its runs are bounded by their timeout), e.g. on exit."""
+    if benchmark_worker and benchmark_worker.isRunning():
+        benchmark_worker.wait()
+
+def handle_run_benchmark():
+    """Runs the selected Python files in separate processes, in the background, and tabulates the timings."""
+    global main_window_instance, benchmark_worker
+    if not main_window_instance:
+        display_error_message("Error", "MainWindow instance not available.")
+        return
+    if benchmark_worker and benchmark_worker.isRunning():
+        main_window_instance.response_display.setText("A benchmark is already running.")
+        return
+
+    paths = [path for path in main_window_instance.selected_file_paths() if path.endswith(".py")]
+    if not paths:
+        main_window_instance.response_display.setText("Select one or more .py files in the file tree to run.")
+        return
+
+    main_window_instance.response_display.setText(f"Running {len(paths)} file(s)...")
+
+    def on_succeeded(results):
+        main_window_instance.show_benchmark_results(results)
+        lines = [f"{os.path.basename(r.path)}: {r.status}, {r.wall_time:.3f}s wall" for r in results]
+        main_window_instance.response_display.setText("Run & Benchmark finished.\n" + "\n".join(lines))
+
+    benchmark_worker = BenchmarkWorker(paths, main_window_instance)
+    benchmark_worker.succeeded.connect(on_succeeded)
+    main_window_instance.run_button.setEnabled(False)
+    benchmark_worker.finished.connect(lambda: main_window_instance.run_button.setEnabled(True))
+    benchmark_worker.start()
 
 def handle_save_project():
     global main_window_instance
@@ -50,7 +373,8 @@ def handle_save_project():
         display_error_message("Error", "MainWindow instance not available for saving.")
         return
 
-    if not os.path.exists(OUTPUT_DIR_PATH) or not os.listdir(OUTPUT_DIR_PATH):
+    artifacts = get_artifact_manifest()
+    if artifacts.is_empty():
         main_window_instance.response_display.setText("Output directory is empty. Nothing to save.")
         return
 
@@ -67,14 +391,44 @@ def handle_save_project():
 
     try:
         archive_base_name = os.path.splitext(zip_file_path)[0]
-        shutil.make_archive(archive_base_name, 'zip', OUTPUT_DIR_PATH)
         final_archive_path = archive_base_name + ".zip"
+        # Archive exactly the files in the manifest instead of walking the directory again.
+        with zipfile.ZipFile(final_archive_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for rel_path in artifacts.files():
+                zf.write(os.path.join(OUTPUT_DIR_PATH, *rel_path.split("/")), rel_path)
         main_window_instance.response_display.setText(f"Project saved successfully to {final_archive_path}")
     except Exception as e:
         display_error_message("Error Saving Project", f"Error saving project: {e}")
         main_window_instance.response_display.setText(f"Error saving project: {e}")
 
 
+def stage_manifest_changes(repo, artifacts):
+    """Stages what changed in OUTPUT_DIR_PATH, like `git add -A`, using the manifest.
+
+    The manifest stores git blob ids, so comparing it with the index tells us
+    what changed without rescanning the working tree. As with `git add -A`,
+    new files matched by .gitignore are skipped; files that are already tracked
+    keep being updated. Returns True if the index differs from HEAD afterwards.
+    """
+    index = repo.index
+    indexed = {path: entry.hexsha for (path, _stage), entry in index.entries.items()}
+    manifest_entries = artifacts.entries()
+    changed = [path for path, entry in manifest_entries.items() if indexed.get(path) != entry["hash"]]
+    untracked = [path for path in changed if path not in indexed]
+    ignored = set()
+    for start in range(0, len(untracked), 500): # Keep each check-ignore command line short
+        ignored.update(repo.ignored(*untracked[start:start + 500]))
+    changed = [path for path in changed if path not in ignored]
+    removed = [path for path in indexed if path not in manifest_entries]
+    if changed:
+        index.add(changed)
+    if removed:
+        index.remove(removed)
+    has_changes = bool(changed or removed)
+    if not has_changes and repo.head.is_valid():
+        has_changes = bool(index.diff(repo.head.commit)) # Staged by an earlier, interrupted upload
+    return has_changes
+
 def handle_upload_to_github():
     global main_window_instance
     if not main_window_instance:
@@ -86,7 +440,8 @@ def handle_upload_to_github():
         main_window_instance.response_display.setText("GitPython is not installed. Please run 'pip install GitPython'.")
         return
 
-    if not os.path.exists(OUTPUT_DIR_PATH) or not os.listdir(OUTPUT_DIR_PATH):
+    artifacts = get_artifact_manifest()
+    if artifacts.is_empty():
         main_window_instance.response_display.setText("Output directory is empty. Nothing to upload.")
         return
 
@@ -131,8 +486,8 @@ def handle_upload_to_github():
         QApplication.processEvents()
 
         # Add and Commit
-        repo.git.add(A=True)
-        if repo.is_dirty(untracked_files=True): # Check if there's anything to commit
+        has_changes = stage_manifest_changes(repo, artifacts)
+        if has_changes:
             commit_message = f"Automated commit on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             repo.index.commit(commit_message)
             main_window_instance.response_display.append("Committed all files.")
@@ -208,8 +563,27 @@ def handle_upload_to_github():
         main_window_instance.response_display.append(error_message)
 
 
-def main():
+def handle_search_files():
     global main_window_instance
+    if not main_window_instance:
+        display_error_message("Error", "MainWindow instance not available for search.")
+        return
+
+    query = main_window_instance.search_input.text().strip()
+    if not query:
+        main_window_instance.response_display.setText("Please enter a file name to search for.")
+        return
+
+    matches = get_artifact_manifest().search(query)
+    if matches:
+        main_window_instance.response_display.setText(
+            f"Files matching '{query}':\n" + "\n".join(matches))
+    else:
+        main_window_instance.response_display.setText(f"No files matching '{query}'.")
+
+
+def main():
+    global main_window_instance, artifact_watcher
 
     if not os.path.exists(OUTPUT_DIR_PATH):
         try:
@@ -223,14 +597,33 @@ def main():
         # Consider a QMessageBox here if API is critical for any startup task.
         pass # Allow GUI to start, API errors will be handled per-action
 
+    prompt_index.load()
+
     app = QApplication(sys.argv)
     main_window_instance = MainWindow()
 
+    artifact_watcher = ManifestWatcher(ArtifactManifest(OUTPUT_DIR_PATH))
+    artifact_watcher.start()
+    app.aboutToQuit.connect(artifact_watcher.stop)
+    app.aboutToQuit.connect(stop_template_batch)
+    app.aboutToQuit.connect(wait_for_benchmark)
+
     # Connect buttons
     if hasattr(main_window_instance, 'generate_button'):
         main_window_instance.generate_button.clicked.connect(handle_generate_code)
     if hasattr(main_window_instance, 'save_button'):
         main_window_instance.save_button.clicked.connect(handle_save_project)
+    if hasattr(main_window_instance, 'search_input'):
+        main_window_instance.search_input.returnPressed.connect(handle_search_files)
+    if hasattr(main_window_instance, 'run_button'):
+        main_window_instance.run_button.clicked.connect(handle_run_benchmark)
+    if hasattr(main_window_instance, 'new_chat_button'):
+        main_window_instance.new_chat_button.clicked.connect(handle_new_chat)
+    if hasattr(main_window_instance, 'template_selector'):
+        main_window_instance.set_template_names(template_library.names())
+        main_window_instance.template_selector.activated.connect(handle_apply_template)
+        main_window_instance.save_template_button.clicked.connect(handle_save_template)
+        main_window_instance.template_batch_button.clicked.connect(handle_run_template_batch)
 
     # Conditionally enable GitHub button if GitPython is available
     if hasattr(main_window_instance, 'github_button'):
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+import threading
+
+# watchdog gives us inotify (and the native equivalents on other platforms).
+# Without it the watcher falls back to periodic polling.
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# Directories under the output directory that are not project artifacts.
+IGNORED_DIRS = {".git"}
+
+DEFAULT_POLL_INTERVAL = 2.0 # Seconds between polls (fallback) or manifest flushes
+
+
+def default_manifest_path(root_dir):
+    """The manifest lives next to the watched directory, not inside it,
+    so it is never zipped, uploaded or picked up as an artifact itself."""
+    root_dir = os.path.abspath(root_dir)
+    return os.path.join(os.path.dirname(root_dir), f".{os.path.basename(root_dir)}_manifest.json")
+
+
+def git_blob_hash(path):
+    """Content hash of a file, computed the way git computes blob ids.
+
+    Using git's object id lets the GitHub upload compare the manifest with the
+    repository index directly instead of rehashing every file.
+    """
+    sha = hashlib.sha1()
+    sha.update(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class ArtifactManifest:
+    """Thread-safe record of every file under root_dir: size, mtime and content hash.
+
+    Keys are paths relative to root_dir using forward slashes. Files are only
+    rehashed when their size or mtime changes. Files that are still being
+    written can be marked pending and hashed once by flush_pending(), instead
+    of after every write.
+    """
+
+    def __init__(self, root_dir, manifest_path=None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.manifest_path = manifest_path if manifest_path else default_manifest_path(self.root_dir)
+        self._entries = {}
+        self._pending = set() # Absolute paths changed since they were last hashed
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    def load(self):
+        """Loads the persisted manifest, if any. A corrupt file is ignored."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("root_dir") != self.root_dir:
+            return False
+        with self._lock:
+            self._entries = data.get("files", {})
+        return True
+
+    def save(self):
+        """Writes the manifest atomically so a crash never leaves half a file."""
+        with self._lock:
+            data = {"root_dir": self.root_dir, "files": dict(self._entries)}
+            self.dirty = False
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print(f"Error saving artifact manifest {self.manifest_path}: {e}")
+            with self._lock:
+                self.dirty = True
+
+    def relpath(self, path):
+        """Manifest key for an absolute path, or None if it is not an artifact."""
+        rel = os.path.relpath(os.path.abspath(path), self.root_dir)
+        if rel in (os.curdir, os.pardir) or rel.startswith(os.pardir + os.sep):
+            return None
+        parts = rel.split(os.sep)
+        if IGNORED_DIRS.intersection(parts):
+            return None
+        return "/".join(parts)
+
+    def update_path(self, path):
+        """Brings the entry for one file (or everything below a directory) up to date."""
+        rel = self.relpath(path)
+        if rel is None:
+            return
+        with self._lock:
+            self._pending.discard(os.path.abspath(path))
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+                for name in filenames:
+                    self.update_path(os.path.join(dirpath, name))
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.remove_path(path)
+            return
+        with self._lock:
+            entry = self._entries.get(rel)
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                return
+        try:
+            content_hash = git_blob_hash(path)
+        except OSError:
+            # Removed or unreadable between stat and read; the next event catches up.
+            return
+        with self._lock:
+            self._entries[rel] = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": content_hash}
+            self.dirty = True
+
+    def mark_pending(self, path):
+        """Notes that a file changed without hashing it yet; see flush_pending."""
+        if self.relpath(path) is not None:
+            with self._lock:
+                self._pending.add(os.path.abspath(path))
+
+    def flush_pending(self):
+        """Brings every pending file up to date, hashing each once however often it changed."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        for path in sorted(pending):
+            self.update_path(path)
+
+    def remove_path(self, path):
+        """Drops the entry for a file, or every entry below a directory."""
+        rel = self.relpath(path)
+        if rel is None:
+            return
+        prefix = rel + "/"
+        with self._lock:
+            self._pending.discard(os.path.abspath(path))
+            stale = [key for key in self._entries if key == rel or key.startswith(prefix)]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self.dirty = True
+
+    def scan(self):
+        """Full reconciliation with the disk. Only changed files are rehashed."""
+        seen = set()
+        for dirpath, dirnames, filenames in os.walk(self.root_dir):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                seen.add(self.relpath(path))
+                self.update_path(path)
+        with self._lock:
+            stale = [key for key in self._entries if key not in seen]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self.dirty = True
+
+    def files(self):
+        """Sorted relative paths of all known files."""
+        with self._lock:
+            return sorted(self._entries)
+
+    def entries(self):
+        """Copy of the manifest: {relative_path: {"size", "mtime", "hash"}}."""
+        with self._lock:
+            return {key: dict(value) for key, value in self._entries.items()}
+
+    def is_empty(self):
+        with self._lock:
+            return not self._entries
+
+    def search(self, query):
+        """Relative paths whose path contains query (case-insensitive)."""
+        query = query.lower()
+        return [path for path in self.files() if query in path.lower()]
+
+
+class _ManifestEventHandler(FileSystemEventHandler):
+    """Streamed writes produce a modify event per chunk, so created and
+    modified files are only marked pending. They are hashed when the writer
+    closes them, or on the watcher's next flush where close events are not
+    reported."""
+
+    def __init__(self, manifest):
+        super().__init__()
+        self.manifest = manifest
+
+    def on_created(self, event):
+        if event.is_directory:
+            self.manifest.update_path(event.src_path) # Walks whatever is already inside
+        else:
+            self.manifest.mark_pending(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.manifest.mark_pending(event.src_path)
+
+    def on_deleted(self, event):
+        self.manifest.remove_path(event.src_path)
+
+    def on_moved(self, event):
+        self.manifest.remove_path(event.src_path)
+        self.manifest.update_path(event.dest_path)
+
+    def on_closed(self, event):
+        self.manifest.update_path(event.src_path)
+
+
+class ManifestWatcher:
+    """Background service that keeps an ArtifactManifest in sync with the disk.
+
+    Uses filesystem notifications (inotify on Linux) when watchdog is
+    installed and falls back to polling otherwise. A daemon thread hashes
+    pending files and persists the manifest at most once per interval, and
+    only when it changed. Call flush() before reading the manifest to include
+    changes that are still pending.
+    """
+
+    def __init__(self, manifest, interval=DEFAULT_POLL_INTERVAL, use_polling=False):
+        self.manifest = manifest
+        self.interval = interval
+        self.use_polling = use_polling or Observer is None
+        self._observer = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self.manifest.load()
+        self.manifest.scan() # Catch up on anything that changed while we weren't watching
+        self.manifest.save()
+
+        if not self.use_polling:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_ManifestEventHandler(self.manifest), self.manifest.root_dir, recursive=True)
+                self._observer.start()
+            except OSError as e:
+                # e.g. the inotify watch limit was reached
+                print(f"Filesystem notifications unavailable ({e}); falling back to polling.")
+                self._observer = None
+                self.use_polling = True
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ManifestWatcher", daemon=True)
+        self._thread.start()
+
+    def flush(self):
+        """Hashes files whose change events have not been processed yet."""
+        self.manifest.flush_pending()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self.manifest.dirty:
+            self.manifest.save()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            if self.use_polling:
+                self.manifest.scan()
+            else:
+                self.flush()
+            if self.manifest.dirty:
+                self.manifest.save()
+
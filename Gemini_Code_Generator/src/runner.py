@@ -0,0 +1,185 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+DEFAULT_TIMEOUT = 10 # Wall-clock seconds before a run is killed
+DEFAULT_CPU_LIMIT = 10 # CPU seconds (RLIMIT_CPU)
+DEFAULT_MEMORY_LIMIT_MB = 512 # Address space limit (RLIMIT_AS)
+OUTPUT_TAIL_CHARS = 2000 # How much of stdout/stderr is kept per run
+
+# Runs inside the child interpreter: applies the resource limits, then executes
+# the target file as __main__. Doing this in the child (rather than with
+# preexec_fn) keeps Popen safe to call from several threads at once.
+# On Linux ru_maxrss carries over the parent's peak across fork/exec, so the
+# child also reports its own high-water mark (VmHWM) when it exits.
+_BOOTSTRAP = """
+import atexit, os, runpy, sys
+path, cpu_limit, memory_limit, rss_report = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), sys.argv[4]
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource is not None:
+    if cpu_limit > 0:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+    if memory_limit > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+def report_peak_rss():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    with open(rss_report, "w") as report:
+                        report.write(line.split()[1])
+    except OSError:
+        pass
+atexit.register(report_peak_rss)
+sys.argv = [path]
+sys.path.insert(0, os.path.dirname(path)) # As "python path" would, so sibling imports work
+runpy.run_path(path, run_name="__main__")
+"""
+
+
+class RunResult(NamedTuple):
+    path: str
+    exit_code: Optional[int] = None # Negative for "killed by signal N" on POSIX
+    wall_time: float = 0.0 # Seconds
+    cpu_time: Optional[float] = None # User + system seconds; None where unavailable
+    peak_rss_kb: Optional[int] = None # None where unavailable
+    timed_out: bool = False
+    stdout: str = "" # Tail of the output
+    stderr: str = ""
+    error: Optional[str] = None # Set if the run could not be started
+
+    @property
+    def status(self):
+        if self.error:
+            return "Error"
+        if self.timed_out:
+            return "Timed out"
+        if self.exit_code == 0:
+            return "OK"
+        if self.exit_code is not None and self.exit_code < 0:
+            return f"Killed (signal {-self.exit_code})"
+        return f"Failed (exit {self.exit_code})"
+
+
+def _read_tail(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - OUTPUT_TAIL_CHARS, 0))
+        return f.read().decode("utf-8", errors="replace")
+
+
+def _kill_group(proc):
+    """Kills whatever is left of the child's session (see run_file), ignoring an empty one."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def _wait(proc, timeout):
+    """Waits for proc, killing it after timeout. Returns (exit_code, rusage or None, timed_out).
+
+    On POSIX the child is reaped with os.wait4 so its own CPU time and peak
+    RSS are reported, unaffected by other runs going on in parallel. The child
+    leads its own process group there, so any processes it started are killed
+    with it, on timeout as well as after a normal exit.
+    """
+    if not hasattr(os, "wait4"):
+        try:
+            return proc.wait(timeout=timeout), None, False
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            return proc.wait(), None, True
+
+    outcome = {}
+    waiter = threading.Thread(target=lambda: outcome.update(result=os.wait4(proc.pid, 0)), daemon=True)
+    waiter.start()
+    waiter.join(timeout)
+    timed_out = waiter.is_alive()
+    if timed_out:
+        _kill_group(proc) # Not yet reaped, so the group id can't have been reused
+        waiter.join()
+    else:
+        _kill_group(proc) # Background processes the child left behind
+    _pid, status, rusage = outcome["result"]
+    exit_code = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    proc.returncode = exit_code # Already reaped; keep Popen from waiting on it again
+    return exit_code, rusage, timed_out
+
+
+def run_file(path, timeout=DEFAULT_TIMEOUT, cpu_limit=DEFAULT_CPU_LIMIT,
+             memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+    """Runs one Python file in a separate, resource-limited process and measures it.
+
+    The child runs in isolated mode (-I), in a fresh temporary working
+    directory, with an almost empty environment (so API keys are not passed on)
+    and no stdin. It writes no bytecode, so sibling imports leave no
+    __pycache__ behind, and on POSIX it runs in its own session so that
+    processes it starts are killed with it. CPU and memory limits are applied
+    where the platform supports them (0 disables a limit).
+
+    This is process isolation, not a sandbox: the child runs as the current
+    user with full filesystem and network access, so it can read, change or
+    delete anything that user can (including OUTPUT_DIR_PATH and $HOME) and
+    open connections. Only run code you have reviewed.
+    """
+    path = os.path.abspath(path)
+    env = {key: os.environ[key] for key in ("PATH", "SYSTEMROOT") if key in os.environ}
+    env["PYTHONDONTWRITEBYTECODE"] = "1" # -I ignores it, but grandchild interpreters may not use -I
+    with tempfile.TemporaryDirectory(prefix="gemini_run_") as workdir:
+        stdout_path = os.path.join(workdir, ".stdout")
+        stderr_path = os.path.join(workdir, ".stderr")
+        rss_report_path = os.path.join(workdir, ".peak_rss")
+        command = [sys.executable, "-I", "-B", "-c", _BOOTSTRAP, path,
+                   str(cpu_limit), str(memory_limit_mb * 1024 * 1024), rss_report_path]
+        try:
+            with open(stdout_path, "wb") as out, open(stderr_path, "wb") as err:
+                start = time.perf_counter()
+                proc = subprocess.Popen(command, cwd=workdir, env=env,
+                                        stdin=subprocess.DEVNULL, stdout=out, stderr=err,
+                                        start_new_session=hasattr(os, "wait4"))
+                exit_code, rusage, timed_out = _wait(proc, timeout)
+                wall_time = time.perf_counter() - start
+        except OSError as e:
+            return RunResult(path, error=f"Could not start {os.path.basename(path)}: {e}")
+
+        cpu_time = peak_rss_kb = None
+        if rusage is not None:
+            cpu_time = rusage.ru_utime + rusage.ru_stime
+            # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+            peak_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+        try:
+            with open(rss_report_path, "r", encoding="utf-8") as f:
+                peak_rss_kb = int(f.read()) # Preferred: not inflated by the parent's memory
+        except (OSError, ValueError):
+            pass # Killed before it could report, or not Linux
+        return RunResult(
+            path, exit_code=exit_code, wall_time=wall_time, cpu_time=cpu_time,
+            peak_rss_kb=peak_rss_kb, timed_out=timed_out,
+            stdout=_read_tail(stdout_path), stderr=_read_tail(stderr_path),
+        )
+
+
+def run_files(paths, max_workers=None, **limits):
+    """Runs several files concurrently; results are returned in the order of paths.
+
+    Every file gets its own child process, so the pool only supervises them:
+    max_workers caps how many children run at the same time (default: CPU count).
+    `limits` are passed to run_file.
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+    max_workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+        return list(pool.map(lambda path: run_file(path, **limits), paths))
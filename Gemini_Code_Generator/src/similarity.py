@@ -0,0 +1,222 @@
+import json
+import os
+import random
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+# Estimated Jaccard similarity of the prompts' shingles. Rewording or renaming
+# one thing in a 50-word prompt scores about 0.93-0.96, while short requests
+# that differ in one meaningful word ("ascending" vs "descending", "JSON" vs
+# "YAML", "parse_json" vs "send_email") score up to about 0.84. Below 0.9 those
+# start to match, since shingles can't tell a synonym from an opposite.
+DEFAULT_SIMILARITY_THRESHOLD = 0.9
+DEFAULT_MAX_ENTRIES = 2000
+# 16 bands of 8 rows put the LSH candidate cut-off around 70% similarity, below
+# the threshold even for the noisier signatures of short prompts, so
+# near-duplicates are very unlikely to be missed.
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16
+# Candidates are scored on the smallest shingle hashes of each prompt: exact for
+# prompts of up to this many shingles (about 40 words), and within about 0.02 of
+# the true similarity above that.
+DEFAULT_SKETCH_SIZE = 256
+SHINGLE_SIZE = 5 # Characters per character shingle
+WORD_SHINGLE_SIZE = 3 # Words per word shingle; these make word order and whole-word changes count
+SIGNATURE_VERSION = 3 # Bump when signatures stop being comparable with persisted ones
+
+_DENSIFICATION_SEED = 1 # Fixed so persisted signatures stay comparable across runs
+_WORD_HASH_START = 0x5bd1e995 # CRC start value that keeps word hashes apart from character ones
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class SimilarMatch(NamedTuple):
+    similarity: float # (Estimated) Jaccard similarity of the prompts' shingles
+    prompt: str
+    result: Any
+    entry_id: int
+
+
+def normalize_prompt(prompt):
+    """Lowercases and tokenizes a prompt so whitespace and case don't matter."""
+    return _TOKEN_PATTERN.findall(prompt.lower())
+
+
+def shingle_hashes(prompt, size=SHINGLE_SIZE, word_size=WORD_SHINGLE_SIZE):
+    """CRC-32 hashes of the normalized prompt's character and word shingles."""
+    words = normalize_prompt(prompt)
+    if not words:
+        return set()
+    text = " ".join(words).encode("utf-8")
+    count = max(len(text) - size + 1, 1)
+    # map() keeps the per-shingle work in C, which dominates for long prompts.
+    shingles = set(map(text.__getitem__, map(slice, range(count), range(size, count + size))))
+    hashes = set(map(zlib.crc32, shingles))
+    hashes.update(
+        zlib.crc32(" ".join(words[i:i + word_size]).encode("utf-8"), _WORD_HASH_START)
+        for i in range(max(len(words) - word_size + 1, 1))
+    )
+    return hashes
+
+
+class PromptSimilarityIndex:
+    """MinHash/LSH index over past prompts for near-duplicate lookups.
+
+    Each prompt is reduced to a MinHash signature; signatures are split into
+    bands and bucketed, so a lookup only compares against prompts sharing at
+    least one band instead of scanning the whole history. Entries are evicted
+    least-recently-used once max_entries is exceeded. `result` can be any
+    JSON-serializable value (e.g. the path of the generated file).
+
+    Signatures use one-permutation hashing: every shingle hash is assigned to
+    one of num_perm bins and each bin keeps its minimum, with empty bins
+    borrowing from other bins in a fixed random order ("optimal
+    densification"). That costs one pass over the shingles instead of one per
+    permutation, so a lookup is linear in the prompt length: well under a
+    millisecond for a 100-word prompt, a few milliseconds for 500 words.
+    Densified bins make signatures of short prompts noisy, so they only select
+    candidates; the similarity itself comes from bottom-k sketches (the
+    sketch_size smallest shingle hashes).
+    """
+
+    def __init__(self, path=None, threshold=DEFAULT_SIMILARITY_THRESHOLD,
+                 max_entries=DEFAULT_MAX_ENTRIES, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                 sketch_size=DEFAULT_SKETCH_SIZE):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.sketch_size = sketch_size
+        rng = random.Random(_DENSIFICATION_SEED)
+        self._donors = [] # For each bin, the bins an empty one borrows from, in order
+        for _ in range(num_perm):
+            donors = list(range(num_perm))
+            rng.shuffle(donors)
+            self._donors.append(donors)
+        self._entries = OrderedDict() # entry_id -> {"prompt", "result", "signature", "sketch"}, oldest first
+        self._buckets = [{} for _ in range(bands)] # band key -> set of entry ids
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def signature(self, prompt):
+        hashes = shingle_hashes(prompt)
+        if not hashes:
+            return None
+        return self._signature(hashes)
+
+    def _signature(self, hashes):
+        # Later pairs overwrite earlier ones, so with descending hashes every
+        # bin ends up holding its minimum. A hash identifies its bin, so equal
+        # values also mean a borrowed bin came from the same donor.
+        ordered = sorted(hashes, reverse=True)
+        minima = dict(zip(map(self.num_perm.__rmod__, ordered), ordered))
+        signature = []
+        for bin_index, donors in enumerate(self._donors):
+            value = minima.get(bin_index)
+            if value is None:
+                value = next(minima[donor] for donor in donors if donor in minima)
+            signature.append(value)
+        return signature
+
+    def _sketch(self, hashes):
+        return frozenset(sorted(hashes)[:self.sketch_size])
+
+    def _similarity(self, sketch, other):
+        """Bottom-k estimate: the share of the union's smallest hashes found in both sketches."""
+        union = sorted(sketch | other)[:self.sketch_size]
+        return len((sketch & other).intersection(union)) / len(union)
+
+    def _band_keys(self, signature):
+        return [tuple(signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def add(self, prompt, result):
+        """Records a prompt and its result; returns the new entry id (None for empty prompts)."""
+        hashes = shingle_hashes(prompt)
+        if not hashes:
+            return None
+        return self._insert(self._next_id, prompt, result, self._signature(hashes), self._sketch(hashes))
+
+    def _insert(self, entry_id, prompt, result, signature, sketch):
+        self._next_id = max(self._next_id, entry_id + 1)
+        self._entries[entry_id] = {"prompt": prompt, "result": result, "signature": signature, "sketch": sketch}
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+        return entry_id
+
+    def remove(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for bucket, key in zip(self._buckets, self._band_keys(entry["signature"])):
+            ids = bucket.get(key)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del bucket[key]
+
+    def lookup(self, prompt, threshold=None):
+        """Returns the most similar past prompt at or above threshold, or None."""
+        threshold = self.threshold if threshold is None else threshold
+        hashes = shingle_hashes(prompt)
+        if not hashes:
+            return None
+        signature = self._signature(hashes)
+        sketch = self._sketch(hashes)
+
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+
+        best = None
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            similarity = self._similarity(sketch, entry["sketch"])
+            if similarity >= threshold and (best is None or similarity > best.similarity):
+                best = SimilarMatch(similarity, entry["prompt"], entry["result"], entry_id)
+        if best is not None:
+            self._entries.move_to_end(best.entry_id) # Mark as recently used
+        return best
+
+    def load(self):
+        """Loads persisted entries from self.path. A missing or corrupt file is ignored."""
+        if not self.path:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (data.get("num_perm"), data.get("sketch_size"), data.get("version")) != \
+                (self.num_perm, self.sketch_size, SIGNATURE_VERSION):
+            return False # Signatures from a different configuration are not comparable
+        for entry in data.get("entries", []):
+            self._insert(entry["id"], entry["prompt"], entry["result"], entry["signature"], frozenset(entry["sketch"]))
+        return True
+
+    def save(self):
+        """Writes the index to self.path atomically."""
+        if not self.path:
+            return
+        data = {
+            "version": SIGNATURE_VERSION,
+            "num_perm": self.num_perm,
+            "sketch_size": self.sketch_size,
+            "entries": [dict(entry, id=entry_id, sketch=sorted(entry["sketch"]))
+                        for entry_id, entry in self._entries.items()],
+        }
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving prompt similarity index {self.path}: {e}")
@@ -0,0 +1,236 @@
+import csv
+import json
+import os
+import re
+import string
+from collections import OrderedDict
+
+import google.generativeai as genai
+import GeminiAPI
+
+TEMPLATE_EXTENSION = ".json"
+# Template names double as file names, so keep them to a safe character set.
+TEMPLATE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_\- ]+$")
+DEFAULT_PROMPT_CACHE_SIZE = 256
+
+
+class PromptTemplate:
+    """A parameterized prompt, parsed once into literal text and variable slots.
+
+    Placeholders use string.Template syntax: $name or ${name}, with $$ for a
+    literal dollar sign. A template may carry its own model and generation
+    config, which are used for every prompt rendered from it.
+    """
+
+    def __init__(self, name, text, model_name=None, generation_config=None, description=""):
+        self.name = name
+        self.text = text
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.description = description
+        self._segments = self._compile(text)
+        # Variable names in order of first appearance
+        self.variables = tuple(dict.fromkeys(value for is_var, value in self._segments if is_var))
+        self._model = None
+
+    @staticmethod
+    def _compile(text):
+        segments = [] # (is_variable, literal text or variable name)
+        pos = 0
+        for match in string.Template.pattern.finditer(text):
+            if match.start() > pos:
+                segments.append((False, text[pos:match.start()]))
+            if match.group("escaped") is not None:
+                segments.append((False, string.Template.delimiter))
+            elif match.group("invalid") is not None:
+                raise ValueError(f"Invalid placeholder in template at position {match.start()}.")
+            else:
+                segments.append((True, match.group("named") or match.group("braced")))
+            pos = match.end()
+        if pos < len(text):
+            segments.append((False, text[pos:]))
+        return segments
+
+    def render(self, params=None, **kwargs):
+        """Substitutes the given values; raises ValueError if any variable is missing."""
+        values = dict(params or {})
+        values.update(kwargs)
+        missing = [name for name in self.variables if name not in values]
+        if missing:
+            raise ValueError(f"Missing values for template '{self.name}': {', '.join(missing)}")
+        return "".join(str(values[value]) if is_var else value for is_var, value in self._segments)
+
+    def cache_key(self, prompt):
+        """Key for caching results of a rendered prompt under this template's model settings."""
+        config = json.dumps(self.generation_config, sort_keys=True) if self.generation_config else None
+        return (self.model_name, config, prompt)
+
+    def make_client(self, **kwargs):
+        """An AsyncGeminiClient bound to this template's model and generation config."""
+        if self.model_name:
+            kwargs.setdefault("model_name", self.model_name)
+        if self.generation_config:
+            kwargs.setdefault("generation_config", self.generation_config)
+        return GeminiAPI.AsyncGeminiClient(**kwargs)
+
+    def make_model(self):
+        """A GenerativeModel with this template's settings, for single (non-batch) prompts.
+
+        Returns None if the template has no settings of its own, in which case
+        the global GeminiAPI.model applies. genai must already be configured.
+        """
+        if not self.model_name and not self.generation_config:
+            return None
+        if self._model is None:
+            self._model = genai.GenerativeModel(
+                model_name=self.model_name or GeminiAPI.DEFAULT_MODEL_NAME,
+                generation_config=self.generation_config or GeminiAPI.generation_config,
+                safety_settings=GeminiAPI.safety_settings,
+            )
+        return self._model
+
+    def to_dict(self):
+        data = {"template": self.text}
+        if self.description:
+            data["description"] = self.description
+        if self.model_name:
+            data["model_name"] = self.model_name
+        if self.generation_config:
+            data["generation_config"] = self.generation_config
+        return data
+
+
+class PromptResultCache:
+    """Least-recently-used cache of batch results, keyed by PromptTemplate.cache_key().
+
+    Values are GenerationResult handles (file path plus a bounded preview), so
+    the generated code itself stays on disk. A result whose file has been
+    deleted since counts as a miss.
+    """
+
+    def __init__(self, max_entries=DEFAULT_PROMPT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> GenerationResult, oldest first
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        result = self._entries.get(key)
+        if result is None:
+            return None
+        if not os.path.isfile(result.filepath):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class TemplateLibrary:
+    """Prompt templates stored as JSON files in templates_dir.
+
+    Each file is compiled the first time it is requested and served from an
+    in-memory cache until its modification time changes.
+    """
+
+    def __init__(self, templates_dir):
+        self.templates_dir = templates_dir
+        self._compiled = {} # name -> (mtime, PromptTemplate)
+        self.prompt_cache = PromptResultCache()
+
+    def _path(self, name):
+        if not TEMPLATE_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid template name '{name}'. Use letters, digits, spaces, '-' or '_'.")
+        return os.path.join(self.templates_dir, name + TEMPLATE_EXTENSION)
+
+    def names(self):
+        if not os.path.isdir(self.templates_dir):
+            return []
+        return sorted(
+            os.path.splitext(entry)[0] for entry in os.listdir(self.templates_dir)
+            if entry.endswith(TEMPLATE_EXTENSION)
+        )
+
+    def get(self, name):
+        """Returns the compiled template, reloading it only if the file changed."""
+        path = self._path(name)
+        mtime = os.path.getmtime(path)
+        cached = self._compiled.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if "template" not in data:
+            raise ValueError(f"Template file {path} has no 'template' entry.")
+        template = PromptTemplate(
+            name, data["template"],
+            model_name=data.get("model_name"),
+            generation_config=data.get("generation_config"),
+            description=data.get("description", ""),
+        )
+        self._compiled[name] = (mtime, template)
+        return template
+
+    def save(self, template):
+        """Writes a template to disk; it replaces any existing template of the same name."""
+        path = self._path(template.name)
+        os.makedirs(self.templates_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(template.to_dict(), f, indent=4)
+        self._compiled[template.name] = (os.path.getmtime(path), template)
+
+
+def load_csv_rows(csv_path):
+    """Reads a CSV with a header row into a list of {column: value} dicts."""
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+async def run_template_batch(template, rows, client=None, cache=None, on_progress=None, **client_kwargs):
+    """Renders the template for every row and generates all prompts concurrently.
+
+    Identical rendered prompts are sent only once, and prompts already present
+    in `cache` (a PromptResultCache) are not sent at all. Without an explicit
+    `client`, one bound to the template is created and closed afterwards;
+    `client_kwargs` are passed to it. `on_progress(done, total)` is called as
+    distinct prompts complete. Results are GenerationResults in row order.
+    """
+    prompts = [template.render(row) for row in rows] # Fail fast on missing columns
+    cache = cache if cache is not None else PromptResultCache()
+    unique = list(dict.fromkeys(prompts))
+    results = {}
+    for prompt in unique:
+        cached = cache.get(template.cache_key(prompt))
+        if cached is not None:
+            results[prompt] = cached
+    pending = [prompt for prompt in unique if prompt not in results]
+
+    done = len(results)
+    if on_progress is not None:
+        on_progress(done, len(unique))
+
+    def record(index, result):
+        nonlocal done
+        prompt = pending[index]
+        results[prompt] = result
+        if not result.error: # Don't cache errors
+            cache.put(template.cache_key(prompt), result)
+        done += 1
+        if on_progress is not None:
+            on_progress(done, len(unique))
+
+    if pending:
+        if client is None:
+            async with template.make_client(**client_kwargs) as own_client:
+                await own_client.agenerate_batch_to_file(pending, on_result=record)
+        else:
+            await client.agenerate_batch_to_file(pending, on_result=record)
+
+    return [results[prompt] for prompt in prompts]
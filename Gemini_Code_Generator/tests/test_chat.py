@@ -0,0 +1,132 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import shutil
+import sys
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import google.generativeai as genai
+import GeminiAPI
+from chat import ChatSession, SUMMARY_PREFIX
+
+
+def make_content(role, text):
+    return genai.protos.Content(role=role, parts=[genai.protos.Part(text=text)])
+
+
+def make_chunk(text):
+    chunk = MagicMock()
+    chunk.parts = [MagicMock()] if text else []
+    chunk.text = text
+    return chunk
+
+
+class FakeChat:
+    """Stands in for the SDK ChatSession: replies are recorded as soon as they are sent."""
+
+    def __init__(self, reply):
+        self.history = []
+        self.last = None
+        self.reply = reply
+
+    def send_message(self, text, stream=False):
+        reply = self.reply(text)
+        self.history.extend([make_content("user", text), make_content("model", reply)])
+        response = MagicMock()
+        response.__iter__.return_value = iter([make_chunk(reply)])
+        response.prompt_feedback = None
+        return response
+
+    def rewind(self):
+        return self.history.pop(-2), self.history.pop()
+
+
+class TestChatSession(unittest.TestCase):
+
+    def setUp(self):
+        self.test_output_dir = "output_test_chat"
+        self.original_output_dir = GeminiAPI.OUTPUT_DIR
+        GeminiAPI.OUTPUT_DIR = self.test_output_dir
+        if os.path.exists(self.test_output_dir):
+            shutil.rmtree(self.test_output_dir)
+        os.makedirs(self.test_output_dir)
+
+        self.fake_chat = FakeChat(lambda text: f"# code for {text}\n" + "x = 1\n" * 20)
+        self.model = MagicMock()
+        self.model.start_chat.return_value = self.fake_chat
+        summary_response = MagicMock()
+        summary_response.parts = [MagicMock()]
+        summary_response.text = "User wants a parser."
+        self.model.generate_content.return_value = summary_response
+
+    def tearDown(self):
+        GeminiAPI.OUTPUT_DIR = self.original_output_dir
+        if os.path.exists(self.test_output_dir):
+            shutil.rmtree(self.test_output_dir)
+
+    def test_send_streams_reply_to_file_and_keeps_history(self):
+        session = ChatSession("Chat 1", model=self.model)
+
+        first = session.send("write a parser")
+        second = session.send("now add error handling")
+
+        self.assertIsNone(first.error)
+        with open(second.filepath, encoding="utf-8") as f:
+            self.assertTrue(f.read().startswith("# code for now add error handling"))
+        self.assertEqual(len(session.history), 4)
+        self.assertEqual(session.turn_count, 2)
+        self.assertEqual(session.compaction_count, 0)
+        self.model.generate_content.assert_not_called()
+
+    def test_old_turns_are_summarized_when_over_budget(self):
+        session = ChatSession("Chat 1", model=self.model, token_budget=150, keep_recent_turns=1)
+
+        for i in range(4):
+            session.send(f"request {i}")
+
+        history = session.history
+        self.assertGreater(session.compaction_count, 0)
+        self.assertEqual(len(history), 4) # Summary pair + latest exchange
+        self.assertEqual(history[0].parts[0].text, SUMMARY_PREFIX + "User wants a parser.")
+        self.assertEqual(history[2].parts[0].text, "request 3")
+        self.assertLessEqual(session.history_tokens(), 150)
+        transcript = self.model.generate_content.call_args[0][0]
+        self.assertIn("User: request 0", transcript)
+
+    def test_recent_turns_dropped_before_summary(self):
+        session = ChatSession("Chat 1", model=self.model, token_budget=100, keep_recent_turns=2)
+
+        for i in range(3):
+            session.send(f"request {i}")
+
+        history = session.history
+        self.assertEqual(session.compaction_count, 1)
+        self.assertEqual(history[0].parts[0].text, SUMMARY_PREFIX + "User wants a parser.")
+        self.assertEqual([c.parts[0].text for c in history[2::2]], ["request 2"])
+        self.assertLessEqual(session.history_tokens(), 100)
+
+    def test_oldest_turns_dropped_when_summary_fails(self):
+        self.model.generate_content.side_effect = RuntimeError("quota exceeded")
+        session = ChatSession("Chat 1", model=self.model, token_budget=60, keep_recent_turns=2)
+
+        for i in range(3):
+            session.send(f"request {i}")
+
+        self.assertEqual([c.parts[0].text for c in session.history[::2]], ["request 2"])
+
+    def test_failed_turn_is_removed_from_history(self):
+        session = ChatSession("Chat 1", model=self.model)
+        session.send("write a parser")
+        self.fake_chat.reply = lambda text: ""
+
+        result = session.send("blocked request")
+
+        self.assertIsNotNone(result.error)
+        self.assertEqual(len(session.history), 2)
+        self.assertEqual(session.turn_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
-from unittest.mock import patch, MagicMock, mock_open
+from unittest.mock import patch, MagicMock, AsyncMock, mock_open
+import asyncio
 import os
 import shutil
 import sys
@@ -131,6 +132,244 @@ class TestGeminiAPI(unittest.TestCase):
                 wrapped_init.assert_called_once() # Check that auto-init was attempted
                 self.assertIn("Error: API Client not initialized and failed to auto-initialize.", return_message)
 
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_generate_code_to_file_keeps_bounded_preview(self, mock_configure, mock_generative_model):
+        """Test that streamed output goes to disk and only a preview is returned."""
+        chunks = []
+        for text in ["a" * 30, "b" * 30, "c" * 30]:
+            chunk = MagicMock()
+            chunk.parts = [MagicMock()]
+            chunk.text = text
+            chunks.append(chunk)
+        mock_model_instance = MagicMock()
+        mock_model_instance.generate_content.return_value = iter(chunks)
+        mock_generative_model.return_value = mock_model_instance
+        GeminiAPI.init_client(api_key="fake_key")
+
+        result = GeminiAPI.generate_code_to_file("Long output please", preview_chars=40)
+
+        mock_model_instance.generate_content.assert_called_once_with(["Long output please"], stream=True)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.preview, "a" * 30 + "b" * 10)
+        self.assertTrue(result.truncated)
+        self.assertEqual(result.size, 90)
+        with open(result.filepath, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "a" * 30 + "b" * 30 + "c" * 30)
+        self.assertIn("preview truncated, 90 bytes in file", result.message)
+
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_generate_code_to_file_blocked(self, mock_configure, mock_generative_model):
+        """Test that a blocked streamed prompt leaves no file behind."""
+        mock_response = MagicMock()
+        mock_response.__iter__.return_value = iter([])
+        mock_response.prompt_feedback.block_reason = "SAFETY"
+        mock_response.prompt_feedback.block_reason_message = "Blocked for safety."
+        mock_model_instance = MagicMock()
+        mock_model_instance.generate_content.return_value = mock_response
+        mock_generative_model.return_value = mock_model_instance
+        GeminiAPI.init_client(api_key="fake_key")
+
+        result = GeminiAPI.generate_code_to_file("Some harmful prompt")
+
+        self.assertEqual(result.error, "Error: Prompt blocked due to Blocked for safety.")
+        self.assertIsNone(result.filepath)
+        self.assertEqual(os.listdir(self.test_output_dir), [])
+
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_generate_code_to_file_stream_error_removes_partial_file(self, mock_configure, mock_generative_model):
+        """Test that a stream failing midway leaves no truncated file behind."""
+        def broken_stream():
+            chunk = MagicMock()
+            chunk.parts = [MagicMock()]
+            chunk.text = "def half("
+            yield chunk
+            raise RuntimeError("connection reset")
+        mock_model_instance = MagicMock()
+        mock_model_instance.generate_content.return_value = broken_stream()
+        mock_generative_model.return_value = mock_model_instance
+        GeminiAPI.init_client(api_key="fake_key")
+
+        result = GeminiAPI.generate_code_to_file("Some prompt")
+
+        self.assertIn("connection reset", result.error)
+        self.assertEqual(os.listdir(self.test_output_dir), [])
+
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_generate_code_to_file_same_second_gets_distinct_files(self, mock_configure, mock_generative_model):
+        """Test that generations within the same second don't overwrite each other."""
+        def stream(text):
+            chunk = MagicMock()
+            chunk.parts = [MagicMock()]
+            chunk.text = text
+            return iter([chunk])
+        mock_model_instance = MagicMock()
+        mock_model_instance.generate_content.side_effect = [stream("first"), stream("second")]
+        mock_generative_model.return_value = mock_model_instance
+        GeminiAPI.init_client(api_key="fake_key")
+
+        fixed_datetime = datetime.datetime(2023, 1, 1, 12, 0, 0)
+        with patch('datetime.datetime') as mock_datetime:
+            mock_datetime.now.return_value = fixed_datetime
+            first = GeminiAPI.generate_code_to_file("one")
+            second = GeminiAPI.generate_code_to_file("two")
+
+        self.assertNotEqual(first.filepath, second.filepath)
+        with open(first.filepath, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "first")
+
+
+class TestAsyncGeminiClient(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.test_output_dir = "output_test_async_gemini_api"
+        if os.path.exists(self.test_output_dir):
+            shutil.rmtree(self.test_output_dir)
+        os.makedirs(self.test_output_dir)
+
+        model_patcher = patch('google.generativeai.GenerativeModel')
+        transport_patcher = patch('google.ai.generativelanguage.GenerativeServiceAsyncClient')
+        self.mock_generative_model = model_patcher.start()
+        self.mock_transport = transport_patcher.start()
+        self.addCleanup(model_patcher.stop)
+        self.addCleanup(transport_patcher.stop)
+        self.mock_model_instance = MagicMock()
+        self.mock_generative_model.return_value = self.mock_model_instance
+
+    def tearDown(self):
+        if os.path.exists(self.test_output_dir):
+            shutil.rmtree(self.test_output_dir)
+
+    def _make_client(self, **kwargs):
+        return GeminiAPI.AsyncGeminiClient(api_key="fake_key", output_dir=self.test_output_dir, **kwargs)
+
+    @staticmethod
+    def _make_response(text):
+        response = MagicMock()
+        response.text = text
+        response.parts = [MagicMock()]
+        response.prompt_feedback = None
+        return response
+
+    def test_requires_api_key(self):
+        with patch.object(GeminiAPI, 'API_KEY', "YOUR_API_KEY_HERE"):
+            with self.assertRaises(ValueError):
+                GeminiAPI.AsyncGeminiClient()
+
+    async def test_agenerate_code_uses_per_instance_transport(self):
+        self.mock_model_instance.generate_content_async = AsyncMock(
+            return_value=self._make_response("print('hi')"))
+        client = self._make_client()
+
+        message = await client.agenerate_code("Say hi")
+
+        self.mock_transport.assert_called_once_with(client_options={"api_key": "fake_key"})
+        self.assertIs(self.mock_model_instance._async_client, self.mock_transport.return_value)
+        self.mock_model_instance.generate_content_async.assert_awaited_once_with(["Say hi"])
+        self.assertIn("Code generated and saved to generated_code_", message)
+        saved_files = os.listdir(self.test_output_dir)
+        self.assertEqual(len(saved_files), 1)
+        with open(os.path.join(self.test_output_dir, saved_files[0]), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "print('hi')")
+
+    async def test_agenerate_code_timeout(self):
+        async def slow_call(*args, **kwargs):
+            await asyncio.sleep(10)
+        self.mock_model_instance.generate_content_async = slow_call
+        client = self._make_client()
+
+        message = await client.agenerate_code("Slow prompt", timeout=0.01)
+
+        self.assertEqual(message, "Error: Code generation timed out after 0.01 seconds.")
+        self.assertEqual(os.listdir(self.test_output_dir), [])
+
+    async def test_agenerate_batch_limits_concurrency(self):
+        in_flight = 0
+        peak = 0
+
+        async def fake_call(prompt_parts, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return self._make_response(f"# {prompt_parts[0]}")
+        self.mock_model_instance.generate_content_async = fake_call
+        client = self._make_client(max_concurrency=2)
+
+        results = await client.agenerate_batch([f"prompt {i}" for i in range(6)])
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(len(results), 6)
+        for i, message in enumerate(results):
+            self.assertTrue(message.endswith(f"# prompt {i}"))
+        # Concurrent results must not overwrite each other's files.
+        self.assertEqual(len(os.listdir(self.test_output_dir)), 6)
+
+    async def test_astream_code_yields_and_saves_chunks(self):
+        chunks = [self._make_response("def f():\n"), self._make_response("    return 1\n")]
+
+        async def fake_stream():
+            for chunk in chunks:
+                yield chunk
+        self.mock_model_instance.generate_content_async = AsyncMock(return_value=fake_stream())
+        client = self._make_client()
+        filepath = os.path.join(self.test_output_dir, "streamed.py")
+
+        received = [text async for text in client.astream_code("Write f", filepath=filepath)]
+
+        self.assertEqual(received, ["def f():\n", "    return 1\n"])
+        self.mock_model_instance.generate_content_async.assert_awaited_once_with(["Write f"], stream=True)
+        with open(filepath, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "def f():\n    return 1\n")
+
+    async def test_astream_code_releases_slot_on_close_and_times_only_the_api(self):
+        async def fake_stream():
+            for text in ("a = 1\n", "b = 2\n", "c = 3\n"):
+                await asyncio.sleep(0.01)
+                yield self._make_response(text)
+        self.mock_model_instance.generate_content_async = AsyncMock(side_effect=lambda *a, **kw: fake_stream())
+        client = self._make_client(max_concurrency=1)
+
+        # A slow consumer must not use up the timeout meant for the API.
+        received = []
+        async for text in client.astream_code("Write code", timeout=0.2):
+            received.append(text)
+            await asyncio.sleep(0.15)
+        self.assertEqual(len(received), 3)
+
+        # Closing a stream early frees its slot for the next request.
+        stream = client.astream_code("Write code")
+        await stream.__anext__()
+        self.assertTrue(client._semaphore.locked())
+        await stream.aclose()
+        self.assertFalse(client._semaphore.locked())
+
+    async def test_agenerate_batch_to_file_returns_handles_and_reports_each_result(self):
+        async def fake_call(prompt_parts, **kwargs):
+            async def stream():
+                yield self._make_response(f"# {prompt_parts[0]}\n")
+                if prompt_parts[0] == "bad":
+                    raise RuntimeError("connection reset")
+            return stream()
+        self.mock_model_instance.generate_content_async = fake_call
+        client = self._make_client()
+        finished = []
+
+        results = await client.agenerate_batch_to_file(
+            ["good", "bad"], on_result=lambda index, result: finished.append(index))
+
+        self.assertEqual(sorted(finished), [0, 1])
+        self.assertIsNone(results[0].error)
+        self.assertEqual(results[0].preview, "# good\n")
+        with open(results[0].filepath, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "# good\n")
+        self.assertIn("connection reset", results[1].error)
+        self.assertEqual(os.listdir(self.test_output_dir), [os.path.basename(results[0].filepath)])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import manifest
+from manifest import ArtifactManifest, ManifestWatcher
+
+
+class TestArtifactManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.test_dir = os.path.join(self.project_root, "output_test_manifest")
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(os.path.join(self.test_dir, "subdir"))
+        self._write("file1.py", "print('one')\n")
+        self._write("subdir/file2.txt", "two")
+        self.artifacts = ArtifactManifest(self.test_dir)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        if os.path.exists(self.artifacts.manifest_path):
+            os.remove(self.artifacts.manifest_path)
+
+    def _write(self, rel_path, content):
+        with open(os.path.join(self.test_dir, rel_path), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.05)
+        return False
+
+    def test_scan_records_files_with_git_hashes(self):
+        os.makedirs(os.path.join(self.test_dir, ".git"))
+        self._write(".git/config", "ignored")
+
+        self.artifacts.scan()
+
+        self.assertEqual(self.artifacts.files(), ["file1.py", "subdir/file2.txt"])
+        entry = self.artifacts.entries()["file1.py"]
+        self.assertEqual(entry["size"], len("print('one')\n"))
+        if shutil.which("git"):
+            expected = subprocess.check_output(
+                ["git", "hash-object", os.path.join(self.test_dir, "file1.py")], text=True).strip()
+            self.assertEqual(entry["hash"], expected)
+
+    def test_unchanged_files_are_not_rehashed(self):
+        self.artifacts.scan()
+        with patch.object(manifest, 'git_blob_hash') as mock_hash:
+            self.artifacts.scan()
+            mock_hash.assert_not_called()
+
+    def test_remove_directory_and_search(self):
+        self.artifacts.scan()
+        self.assertEqual(self.artifacts.search("FILE2"), ["subdir/file2.txt"])
+
+        self.artifacts.remove_path(os.path.join(self.test_dir, "subdir"))
+
+        self.assertEqual(self.artifacts.files(), ["file1.py"])
+
+    def test_relpath_accepts_names_starting_with_dots(self):
+        self._write("..weird.py", "x = 1\n")
+        self.artifacts.scan()
+        self.assertIn("..weird.py", self.artifacts.files())
+        self.assertIsNone(self.artifacts.relpath(os.path.join(self.test_dir, os.pardir, "elsewhere.py")))
+
+    @unittest.skipIf(manifest.Observer is None, "watchdog is not installed")
+    def test_streamed_writes_are_hashed_once(self):
+        from watchdog.events import FileClosedEvent, FileModifiedEvent
+        handler = manifest._ManifestEventHandler(self.artifacts)
+        path = os.path.join(self.test_dir, "streamed.py")
+
+        with patch.object(manifest, 'git_blob_hash', wraps=manifest.git_blob_hash) as mock_hash:
+            with open(path, "w", encoding="utf-8") as f:
+                for i in range(200):
+                    f.write(f"line_{i} = {i}\n")
+                    f.flush()
+                    handler.on_modified(FileModifiedEvent(path))
+            self.assertEqual(mock_hash.call_count, 0)
+            handler.on_closed(FileClosedEvent(path))
+            self.artifacts.flush_pending() # Nothing left to do
+            self.assertEqual(mock_hash.call_count, 1)
+        self.assertEqual(self.artifacts.entries()["streamed.py"]["size"], os.path.getsize(path))
+
+    def test_save_and_load_round_trip(self):
+        self.artifacts.scan()
+        self.artifacts.save()
+
+        reloaded = ArtifactManifest(self.test_dir)
+        self.assertTrue(reloaded.load())
+        self.assertEqual(reloaded.entries(), self.artifacts.entries())
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, os.path.basename(reloaded.manifest_path))))
+
+    def test_polling_watcher_tracks_changes(self):
+        watcher = ManifestWatcher(self.artifacts, interval=0.05, use_polling=True)
+        watcher.start()
+        try:
+            self._write("new_file.py", "x = 1\n")
+            os.remove(os.path.join(self.test_dir, "file1.py"))
+            self.assertTrue(self._wait_for(
+                lambda: self.artifacts.files() == ["new_file.py", "subdir/file2.txt"]))
+        finally:
+            watcher.stop()
+        self.assertTrue(os.path.exists(self.artifacts.manifest_path))
+
+    @unittest.skipIf(manifest.Observer is None, "watchdog is not installed")
+    def test_notification_watcher_tracks_changes(self):
+        watcher = ManifestWatcher(self.artifacts, interval=0.05)
+        watcher.start()
+        try:
+            self._write("new_file.py", "x = 1\n")
+            self.assertTrue(self._wait_for(lambda: "new_file.py" in self.artifacts.files()))
+        finally:
+            watcher.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
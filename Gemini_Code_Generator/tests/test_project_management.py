@@ -140,5 +140,76 @@ class TestProjectManagement(unittest.TestCase):
         self.assertEqual(len(os.listdir(self.test_zip_save_dir)), 0)
 
 
+@unittest.skipIf(main.git is None, "GitPython is not installed")
+class TestGitHubUploadStaging(unittest.TestCase):
+
+    def setUp(self):
+        self.project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.test_output_dir = os.path.join(self.project_root, "output_test_upload")
+        if os.path.exists(self.test_output_dir):
+            shutil.rmtree(self.test_output_dir)
+        os.makedirs(self.test_output_dir)
+        self.original_output_dir_path = main.OUTPUT_DIR_PATH
+        main.OUTPUT_DIR_PATH = self.test_output_dir
+
+        self._write(".gitignore", "__pycache__/\n")
+        self._write("app.py", "print('app')\n")
+        self._write("__pycache__/app.cpython-311.pyc", "bytecode")
+        self.repo = main.git.Repo.init(self.test_output_dir)
+        with self.repo.config_writer() as config:
+            config.set_value("user", "name", "Test")
+            config.set_value("user", "email", "test@example.com")
+
+        self.mock_main_window = MagicMock()
+        main.main_window_instance = self.mock_main_window
+
+    def tearDown(self):
+        self.repo.close()
+        main.OUTPUT_DIR_PATH = self.original_output_dir_path
+        main.main_window_instance = None
+        if os.path.exists(self.test_output_dir):
+            shutil.rmtree(self.test_output_dir)
+
+    def _write(self, rel_path, content):
+        path = os.path.join(self.test_output_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _tracked(self):
+        return sorted(path for path, _stage in self.repo.index.entries)
+
+    def test_stage_manifest_changes_respects_gitignore(self):
+        self.assertTrue(main.stage_manifest_changes(self.repo, main.get_artifact_manifest()))
+        self.assertEqual(self._tracked(), [".gitignore", "app.py"])
+
+    def test_stage_manifest_changes_tracks_edits_and_deletions(self):
+        main.stage_manifest_changes(self.repo, main.get_artifact_manifest())
+        self.repo.index.commit("first")
+        self.assertFalse(main.stage_manifest_changes(self.repo, main.get_artifact_manifest()))
+
+        self._write("app.py", "print('changed')\n")
+        os.remove(os.path.join(self.test_output_dir, ".gitignore"))
+        self._write("lib/util.py", "X = 1\n")
+        self.assertTrue(main.stage_manifest_changes(self.repo, main.get_artifact_manifest()))
+
+        # Without the .gitignore the bytecode is no longer ignored, as with `git add -A`.
+        self.assertEqual(self._tracked(), ["__pycache__/app.cpython-311.pyc", "app.py", "lib/util.py"])
+        staged = {diff.a_path for diff in self.repo.index.diff(self.repo.head.commit)}
+        self.assertEqual(staged, {".gitignore", "__pycache__/app.cpython-311.pyc", "app.py", "lib/util.py"})
+
+    @patch('main.git.Remote.push', return_value=[])
+    @patch('main.QInputDialog.getText')
+    def test_handle_upload_to_github_commits_manifest_files(self, mock_get_text, mock_push):
+        mock_get_text.side_effect = [("https://github.com/user/repo.git", True), ("token", True)]
+
+        main.handle_upload_to_github()
+
+        mock_push.assert_called_once()
+        committed = sorted(item.path for item in self.repo.head.commit.tree.traverse() if item.type == "blob")
+        self.assertEqual(committed, [".gitignore", "app.py"])
+        self.mock_main_window.response_display.append.assert_any_call("Committed all files.")
+
+
 if __name__ == '__main__':
     unittest.main()
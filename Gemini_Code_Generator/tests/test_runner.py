@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import sys
+import time
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import runner
+
+
+class TestRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.test_dir = os.path.join(self.project_root, "output_test_runner")
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        os.makedirs(self.test_dir)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _write(self, name, code):
+        path = os.path.join(self.test_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code)
+        return path
+
+    def test_successful_run_is_measured(self):
+        self._write("helper.py", "VALUE = 42\n")
+        path = self._write("ok.py", "import os, helper\nprint(helper.VALUE, os.environ.get('GEMINI_API_KEY'))\n")
+
+        result = runner.run_file(path)
+
+        self.assertEqual(result.status, "OK")
+        self.assertEqual(result.stdout.strip(), "42 None") # Sibling import works, secrets are not passed on
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, "__pycache__")))
+        self.assertGreater(result.wall_time, 0)
+        if hasattr(os, "wait4"):
+            self.assertGreater(result.cpu_time, 0)
+            self.assertGreater(result.peak_rss_kb, 0)
+
+    def test_failure_and_timeout(self):
+        failing = self._write("fail.py", "raise SystemExit(3)\n")
+        sleeping = self._write("sleep.py", "import time\ntime.sleep(30)\n")
+
+        results = runner.run_files([failing, sleeping], timeout=0.5)
+
+        self.assertEqual([r.path for r in results], [failing, sleeping])
+        self.assertEqual(results[0].exit_code, 3)
+        self.assertEqual(results[0].status, "Failed (exit 3)")
+        self.assertTrue(results[1].timed_out)
+        self.assertLess(results[1].wall_time, 10)
+
+    @unittest.skipUnless(os.path.isdir("/proc"), "checks processes through /proc")
+    def test_timeout_kills_grandchildren(self):
+        path = self._write("spawn.py", (
+            "import subprocess, sys, time\n"
+            "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+            "print(child.pid, flush=True)\n"
+            "time.sleep(30)\n"
+        ))
+
+        result = runner.run_file(path, timeout=1)
+
+        self.assertTrue(result.timed_out)
+        grandchild = int(result.stdout.split()[0])
+        deadline = time.monotonic() + 5
+        while self._is_running(grandchild) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(self._is_running(grandchild))
+
+    @staticmethod
+    def _is_running(pid):
+        try:
+            with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+                state = next(line for line in f if line.startswith("State:"))
+        except FileNotFoundError:
+            return False
+        return state.split()[1] != "Z" # A zombie is dead, just not yet reaped
+
+    @unittest.skipUnless(hasattr(os, "wait4"), "resource limits need POSIX")
+    def test_resource_limits(self):
+        spinning = self._write("spin.py", "while True:\n    pass\n")
+        hungry = self._write("hungry.py", "data = bytearray(1024 * 1024 * 1024)\n")
+
+        spin_result, hungry_result = runner.run_files(
+            [spinning, hungry], timeout=20, cpu_limit=1, memory_limit_mb=256)
+
+        self.assertFalse(spin_result.timed_out)
+        self.assertLess(spin_result.exit_code, 0) # Killed by SIGXCPU
+        self.assertIn("MemoryError", hungry_result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import similarity
+from similarity import PromptSimilarityIndex
+
+
+BASE_PROMPT = (
+    "Write a Python function called parse_config that reads a YAML file, validates "
+    "that the keys host, port and timeout are present, converts port to an integer "
+    "and returns the resulting dictionary. Raise ValueError with a helpful message "
+    "when a key is missing and include a docstring with an example."
+)
+SHORT_PROMPT = "Write a Python function parse_config that reads a YAML file and returns its settings as a dictionary."
+# As rendered from templates/python_function.json with different function names
+TEMPLATE_PROMPT = (
+    "Write a Python function named parse_json that reads a file and returns its contents. "
+    "Include type hints, a docstring and basic input validation."
+)
+
+
+class TestPromptSimilarityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.index_path = os.path.join(self.project_root, "prompt_index_test.json")
+        self.index = PromptSimilarityIndex(self.index_path)
+        self.index.add(BASE_PROMPT, "output/parse_config.py")
+        self.index.add(SHORT_PROMPT, "output/short_parse_config.py")
+        self.index.add("Create an HTML page with a centered login form and a submit button.", "output/login.html")
+
+    def tearDown(self):
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+
+    def test_whitespace_and_case_changes_are_exact_matches(self):
+        variant = "  " + BASE_PROMPT.upper().replace(" ", "\n   ") + "  "
+        match = self.index.lookup(variant)
+        self.assertIsNotNone(match)
+        self.assertEqual(match.similarity, 1.0)
+        self.assertEqual(match.result, "output/parse_config.py")
+
+    def test_small_wording_change_is_found(self):
+        for variant in (BASE_PROMPT.replace("parse_config", "load_config"),
+                        BASE_PROMPT.replace("reads", "loads")):
+            match = self.index.lookup(variant)
+            self.assertIsNotNone(match)
+            self.assertEqual(match.result, "output/parse_config.py")
+            self.assertLess(match.similarity, 1.0)
+
+    def test_requests_for_different_things_are_not_matched(self):
+        pairs = [
+            ("Write a Python function that sorts a list of integers in ascending order.",
+             "Write a Python function that sorts a list of integers in descending order."),
+            ("Write a Python function that sorts a list of numbers.",
+             "Write a Python function that reverses a list of numbers."),
+            ("Write a Python function that parses a JSON file.",
+             "Write a Python function that parses a YAML file."),
+            (SHORT_PROMPT, SHORT_PROMPT.replace("YAML", "JSON")),
+            (TEMPLATE_PROMPT, TEMPLATE_PROMPT.replace("parse_json", "send_email")),
+        ]
+        for first, second in pairs:
+            index = PromptSimilarityIndex()
+            index.add(first, "output/first.py")
+            self.assertIsNone(index.lookup(second), second)
+
+    def test_unrelated_prompt_and_threshold(self):
+        self.assertIsNone(self.index.lookup("Implement quicksort in Rust with generics."))
+        variant = BASE_PROMPT.replace("helpful", "clear")
+        self.assertIsNone(self.index.lookup(variant, threshold=1.0))
+        self.assertIsNone(self.index.lookup("   "))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        index = PromptSimilarityIndex(max_entries=2)
+        first = index.add("write a function that reverses a string", "a")
+        index.add("write a function that sums a list", "b")
+        index.lookup("write a function that reverses a string") # Refresh the first entry
+        index.add("write a function that merges two dicts", "c")
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.lookup("write a function that reverses a string").entry_id, first)
+        self.assertIsNone(index.lookup("write a function that sums a list", threshold=0.9))
+
+    def test_save_and_load(self):
+        self.index.save()
+        reloaded = PromptSimilarityIndex(self.index_path)
+        self.assertTrue(reloaded.load())
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded.lookup(BASE_PROMPT).result, "output/parse_config.py")
+        # New entries must not reuse ids of loaded ones.
+        self.assertNotIn(reloaded.add("something else entirely here", "x"), (1, 2, 3))
+
+    def test_signatures_from_another_version_are_not_loaded(self):
+        self.index.save()
+        with patch.object(similarity, 'SIGNATURE_VERSION', similarity.SIGNATURE_VERSION + 1):
+            self.assertFalse(PromptSimilarityIndex(self.index_path).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
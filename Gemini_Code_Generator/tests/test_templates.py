@@ -0,0 +1,166 @@
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import os
+import shutil
+import sys
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import templates
+import GeminiAPI
+from templates import PromptTemplate, PromptResultCache, TemplateLibrary, load_csv_rows, run_template_batch
+
+
+class TestPromptTemplate(unittest.TestCase):
+
+    def test_render_substitutes_variables(self):
+        template = PromptTemplate("t", "Write ${lang} code that $task. Costs $$5. Again: $task")
+        self.assertEqual(template.variables, ("lang", "task"))
+        self.assertEqual(
+            template.render({"lang": "Go"}, task="sorts"),
+            "Write Go code that sorts. Costs $5. Again: sorts"
+        )
+
+    def test_render_missing_variable(self):
+        template = PromptTemplate("t", "Write $lang code that $task")
+        with self.assertRaises(ValueError) as cm:
+            template.render(lang="Go")
+        self.assertIn("task", str(cm.exception))
+
+    def test_invalid_placeholder(self):
+        with self.assertRaises(ValueError):
+            PromptTemplate("t", "Price: $5")
+
+    @patch('GeminiAPI.AsyncGeminiClient')
+    def test_make_client_binds_model_settings(self, mock_client_class):
+        config = {"temperature": 0.1}
+        template = PromptTemplate("t", "x", model_name="gemini-1.5-pro", generation_config=config)
+        template.make_client(api_key="fake_key")
+        mock_client_class.assert_called_once_with(
+            api_key="fake_key", model_name="gemini-1.5-pro", generation_config=config)
+
+    @patch('templates.genai.GenerativeModel')
+    def test_make_model_uses_template_settings(self, mock_model_class):
+        self.assertIsNone(PromptTemplate("t", "x").make_model())
+
+        template = PromptTemplate("t", "x", generation_config={"temperature": 0.1})
+        self.assertIs(template.make_model(), template.make_model())
+        mock_model_class.assert_called_once_with(
+            model_name=GeminiAPI.DEFAULT_MODEL_NAME, generation_config={"temperature": 0.1},
+            safety_settings=GeminiAPI.safety_settings)
+
+
+class TestTemplateLibrary(unittest.TestCase):
+
+    def setUp(self):
+        self.project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.test_dir = os.path.join(self.project_root, "templates_test")
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+        self.library = TemplateLibrary(self.test_dir)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_save_and_get(self):
+        self.library.save(PromptTemplate("py func", "Write $name", generation_config={"temperature": 0.2}))
+
+        reloaded = TemplateLibrary(self.test_dir).get("py func")
+
+        self.assertEqual(TemplateLibrary(self.test_dir).names(), ["py func"])
+        self.assertEqual(reloaded.variables, ("name",))
+        self.assertEqual(reloaded.generation_config, {"temperature": 0.2})
+
+    def test_get_compiles_once_until_file_changes(self):
+        self.library.save(PromptTemplate("t", "Write $name"))
+        library = TemplateLibrary(self.test_dir)
+        with patch.object(templates, 'PromptTemplate', wraps=PromptTemplate) as wrapped:
+            first = library.get("t")
+            self.assertIs(library.get("t"), first)
+            self.assertEqual(wrapped.call_count, 1)
+
+            path = os.path.join(self.test_dir, "t.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('{"template": "Write $other"}')
+            os.utime(path, (os.path.getmtime(path) + 10, os.path.getmtime(path) + 10))
+            self.assertEqual(library.get("t").variables, ("other",))
+            self.assertEqual(wrapped.call_count, 2)
+
+    def test_invalid_name(self):
+        with self.assertRaises(ValueError):
+            self.library.save(PromptTemplate("../escape", "x"))
+
+    def test_load_csv_rows(self):
+        os.makedirs(self.test_dir)
+        csv_path = os.path.join(self.test_dir, "params.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("lang,task\nGo,sorts\nRust,parses\n")
+        self.assertEqual(load_csv_rows(csv_path), [
+            {"lang": "Go", "task": "sorts"}, {"lang": "Rust", "task": "parses"}])
+
+
+class TestRunTemplateBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.test_dir = os.path.join(self.project_root, "template_batch_test")
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _fake_generate(self, prompts, on_result=None):
+        results = []
+        for index, prompt in enumerate(prompts):
+            if prompt == "Write C code":
+                result = GeminiAPI.GenerationResult(error="Error: blocked")
+            else:
+                filepath = os.path.join(self.test_dir, prompt.replace(" ", "_") + ".py")
+                with open(filepath, "w", encoding="utf-8") as f:
+                    f.write(f"# {prompt}")
+                result = GeminiAPI.GenerationResult(filepath=filepath, size=len(prompt) + 2, preview=f"# {prompt}")
+            on_result(index, result)
+            results.append(result)
+        return results
+
+    def test_deduplicates_and_caches_rendered_prompts(self):
+        template = PromptTemplate("t", "Write $lang code")
+        client = MagicMock()
+        client.agenerate_batch_to_file = AsyncMock(side_effect=self._fake_generate)
+        cache = PromptResultCache()
+        progress = []
+        rows = [{"lang": "Go"}, {"lang": "C"}, {"lang": "Go"}]
+
+        results = asyncio.run(run_template_batch(
+            template, rows, client=client, cache=cache, on_progress=lambda done, total: progress.append((done, total))))
+
+        self.assertEqual(client.agenerate_batch_to_file.await_args[0][0], ["Write Go code", "Write C code"])
+        self.assertEqual([r.preview or r.error for r in results], ["# Write Go code", "Error: blocked", "# Write Go code"])
+        self.assertEqual(progress, [(0, 2), (1, 2), (2, 2)])
+        self.assertEqual(len(cache), 1)
+
+        # Successful prompts come from the cache; failed ones are retried.
+        asyncio.run(run_template_batch(template, rows, client=client, cache=cache))
+        self.assertEqual(client.agenerate_batch_to_file.await_args[0][0], ["Write C code"])
+
+    def test_cache_is_bounded_and_drops_deleted_files(self):
+        cache = PromptResultCache(max_entries=2)
+        paths = []
+        for name in ("a", "b", "c"):
+            path = os.path.join(self.test_dir, name + ".py")
+            open(path, "w").close()
+            paths.append(path)
+            cache.put(name, GeminiAPI.GenerationResult(filepath=path, size=0))
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("a"))
+        os.remove(paths[1])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c").filepath, paths[2])
+
+
+if __name__ == '__main__':
+    unittest.main()